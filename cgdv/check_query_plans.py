@@ -0,0 +1,291 @@
+# check_query_plans.py
+"""
+Проверка планов запросов TeammateBot
+
+Прогоняет все методы Database на временной базе, собирает реально
+выполненные SQL-запросы и проверяет через EXPLAIN QUERY PLAN, что ни один
+из них не деградировал до полного прохода (SCAN) по таблице. Затем
+проверяет поведение пакетной записи FSM и архивации пользователей.
+Запуск: python check_query_plans.py
+"""
+
+import asyncio
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+from typing import List, Tuple
+
+SEED_USERS = 2000
+
+def build_database(tmp_dir: str):
+    """Создание временной базы данных"""
+    os.environ["DATABASE_PATH"] = os.path.join(tmp_dir, "data", "plans.db")
+    
+    from database.database import Database
+    return Database()
+
+def seed(db):
+    """Наполнение базы тестовыми анкетами, лайками и матчами"""
+    dota_positions = ["pos1", "pos2", "pos3", "pos4", "pos5", "any"]
+    ratings = ["herald", "guardian", "crusader", "archon", "legend", "ancient", "divine", "immortal"]
+    
+    for telegram_id in range(1, SEED_USERS + 1):
+        game = "dota" if telegram_id % 3 else "cs"
+        db.create_user(telegram_id, f"user{telegram_id}", game)
+        if telegram_id % 10:
+            db.update_user_profile(
+                telegram_id, "Имя Фамилия", f"nick{telegram_id}", 20,
+                ratings[telegram_id % len(ratings)],
+                [dota_positions[telegram_id % len(dota_positions)]],
+                "", None
+            )
+    
+    for telegram_id in range(1, SEED_USERS, 7):
+        db.add_like(telegram_id, telegram_id + 3)
+        db.add_like(telegram_id + 3, telegram_id)
+    
+    with db.pool.connection() as conn:
+        conn.execute("ANALYZE")
+        conn.commit()
+
+def exercise(db) -> List[str]:
+    """Вызов всех методов Database с записью выполненных запросов"""
+    from database.activity import activity_cutoff
+    from database.search_session import SearchCursor, filters_hash
+    
+    queries: List[str] = []
+    
+    def trace(statement: str):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            queries.append(statement)
+    
+    db.pool.set_trace_callback(trace)
+    try:
+        month_ago = activity_cutoff(30)
+        
+        db.get_user(5)
+        # Все сочетания фильтров поиска, с проходом курсора по кольцу до конца
+        for rating_filter, position_filter in ((None, None), ("herald", None), (None, "pos1"), ("herald", "pos1")):
+            cursor = SearchCursor(filters_hash("dota", rating_filter, position_filter))
+            while not cursor.exhausted:
+                db.fetch_search_page(5, cursor, rating_filter, position_filter, limit=7)
+        db.has_like(1, 4)
+        db.add_like(5, 11)
+        db.get_users_who_liked_me(4)
+        inbox = db.get_like_inbox_next(11)
+        position = db.mark_like_reviewed(11, inbox[0]['telegram_id']) if inbox else None
+        db.get_like_inbox_next(11, position)
+        db.get_unread_likes(11)
+        db.claim_likes_digest(11, 1000, 600)
+        db.mark_likes_seen(11)
+        page, next_match_id = db.get_matches_page(1, limit=1)
+        db.get_matches_page(1, limit=1, after_match_id=next_match_id)
+        db.get_last_match(1)
+        db.count_matches(1)
+        db.get_stats()
+        db.get_recent_users(10)
+        db.count_inactive_users(month_ago)
+        db.update_last_activity(5)
+        db.save_fsm_sessions([("fsm:1:5:5:default", True, "SearchStates:browsing_profiles", "{}", 100)], 50)
+        db.get_fsm_session("fsm:1:5:5:default", 0)
+        db.purge_fsm_sessions(50)
+        db.update_user_profile(5, "Имя Фамилия", "nick5", 21, "legend", ["pos2"], "", None)
+        db.delete_user_profile(SEED_USERS)
+        db.delete_users([SEED_USERS - 1, SEED_USERS - 2])
+        db._execute_query("UPDATE users SET last_activity = '2000-01-01 00:00:00' WHERE telegram_id = 6")
+        db.archive_inactive_batch(month_ago, 100)
+        db.restore_user(6)
+        db.purge_inactive_batch(month_ago, 100)
+    finally:
+        db.pool.set_trace_callback(None)
+    
+    return queries
+
+def check_plans(db, queries: List[str]) -> bool:
+    """Проверка планов собранных запросов"""
+    from database import schema
+    
+    failed = 0
+    seen = set()
+    
+    with db.pool.connection() as conn:
+        for query in queries:
+            normalized = " ".join(query.split())
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            
+            try:
+                plan = schema.explain_query_plan(conn, query)
+            except sqlite3.Error as e:
+                print(f"❌ Не удалось получить план: {e}\n   {normalized}")
+                failed += 1
+                continue
+            
+            scans = schema.find_full_scans(plan)
+            if scans and not schema.is_scan_allowed(query):
+                print(f"❌ {normalized}")
+                for step in plan:
+                    print(f"   {step}")
+                failed += 1
+            else:
+                print(f"✅ {normalized[:100]}")
+    
+    print("\n" + "=" * 40)
+    print(f"📊 Запросов проверено: {len(seen)}, с полным проходом: {failed}")
+    return failed == 0
+
+def check_fsm_sessions(db) -> List[Tuple[str, bool]]:
+    """Пакетная запись сессий FSM: частичные изменения и просрочка"""
+    key = "fsm:1:77:77:default"
+    now = int(time.time())
+    
+    db.save_fsm_sessions([(key, True, "ProfileStates:waiting_for_name", None, now)], now - 60)
+    db.save_fsm_sessions([(key, False, None, '{"name":"A"}', now)], now - 60)
+    merged = db.get_fsm_session(key, now - 60)
+    
+    # Сессия старше границы свежести не читается, а частичная запись ее не воскрешает
+    db.save_fsm_sessions([(key, True, "ProfileStates:waiting_for_age", '{"age":20}', now - 120)], now - 60)
+    expired = db.get_fsm_session(key, now - 60)
+    db.save_fsm_sessions([(key, False, None, '{"x":1}', now)], now - 60)
+    revived = db.get_fsm_session(key, now - 60)
+    
+    return [
+        ("состояние и данные пишутся отдельными изменениями",
+         merged == ("ProfileStates:waiting_for_name", '{"name":"A"}')),
+        ("просроченная сессия не читается", expired is None),
+        ("запись данных в просроченную сессию сбрасывает состояние", revived == (None, '{"x":1}')),
+    ]
+
+def check_fsm_storage(db) -> List[Tuple[str, bool]]:
+    """SQLiteStorage: неудачная пачка возвращается в буфер, новые изменения важнее"""
+    try:
+        from aiogram.fsm.storage.base import StorageKey
+        from database.async_database import AsyncDatabase
+        from database.fsm_storage import SQLiteStorage
+    except ImportError as e:
+        print(f"⏭️ SQLiteStorage не проверен: {e}")
+        return []
+    
+    class FlakyDatabase(AsyncDatabase):
+        """Первая запись сессий завершается ошибкой"""
+        failures = 1
+        
+        async def save_fsm_sessions(self, sessions, not_before=0):
+            if self.failures:
+                self.failures -= 1
+                return 0
+            return await super().save_fsm_sessions(sessions, not_before)
+    
+    async def scenario():
+        storage = SQLiteStorage(FlakyDatabase(db), flush_interval=60)
+        key = StorageKey(bot_id=1, chat_id=78, user_id=78)
+        raw_key = storage.key_builder.build(key)
+        
+        await storage.set_state(key, "ProfileStates:waiting_for_name")
+        await storage.set_data(key, {"name": "A"})
+        await storage.flush()
+        failed = db.get_fsm_session(raw_key, 0)
+        requeued = await storage.get_state(key)
+        
+        await storage.set_state(key, "ProfileStates:waiting_for_nickname")
+        await storage.close()
+        return failed, requeued, db.get_fsm_session(raw_key, 0)
+    
+    failed, requeued, saved = asyncio.run(scenario())
+    return [
+        ("неудачная пачка не попадает в базу", failed is None),
+        ("неудачная пачка остается в буфере", requeued == "ProfileStates:waiting_for_name"),
+        ("повторная запись сохраняет более новое состояние и старые данные",
+         saved == ("ProfileStates:waiting_for_nickname", '{"name":"A"}')),
+    ]
+
+def check_archive(db) -> List[Tuple[str, bool]]:
+    """Архивация неактивных пользователей и возврат из архива"""
+    from database.activity import activity_cutoff
+    
+    telegram_id = SEED_USERS + 100
+    db.create_user(telegram_id, "archived", "dota")
+    db.update_user_profile(telegram_id, "Имя Фамилия", "archived", 25, "legend", ["pos1", "pos3"], "", None)
+    db._execute_query(
+        "UPDATE users SET last_activity = '2000-01-01 00:00:00' WHERE telegram_id = ?", (telegram_id,)
+    )
+    
+    def counter(name: str) -> int:
+        rows = db._execute_query("SELECT value FROM stats_counters WHERE name = ?", (name,))
+        return rows[0]['value'] if rows else 0
+    
+    def positions() -> List[str]:
+        rows = db._execute_query(
+            "SELECT position FROM user_positions WHERE telegram_id = ? ORDER BY position", (telegram_id,)
+        )
+        return [row['position'] for row in rows]
+    
+    users_before, archived_before = counter('total_users'), counter('archived_users')
+    
+    moved = db.archive_inactive_batch(activity_cutoff(30), 1000)
+    archived = db.get_user(telegram_id) is None and db.fetch_user(telegram_id) is None
+    in_archive = bool(db._execute_query(
+        "SELECT 1 FROM users_archive WHERE telegram_id = ?", (telegram_id,)
+    ))
+    counters_moved = (counter('total_users') == users_before - moved
+                      and counter('archived_users') == archived_before + moved)
+    positions_cleared = positions() == []
+    
+    restored = db.restore_user(telegram_id)
+    
+    return [
+        ("неактивный пользователь уходит в архив", moved >= 1 and in_archive),
+        ("чтение анкеты не возвращает ее из архива", archived),
+        ("счетчики пользователей и архива учитывают перенос", counters_moved),
+        ("позиции архивного пользователя не участвуют в поиске", positions_cleared),
+        ("restore_user возвращает анкету с позициями",
+         restored is not None and restored['positions'] == ["pos1", "pos3"] and positions() == ["pos1", "pos3"]),
+        ("после возврата пользователя нет в архиве", not db._execute_query(
+            "SELECT 1 FROM users_archive WHERE telegram_id = ?", (telegram_id,)
+        )),
+        ("повторный restore_user ничего не делает", db.restore_user(telegram_id) is None),
+    ]
+
+def check_behaviour(db) -> bool:
+    """Проверка поведения, которое не видно по планам запросов"""
+    results = check_fsm_sessions(db) + check_fsm_storage(db) + check_archive(db)
+    
+    for name, ok in results:
+        print(f"{'✅' if ok else '❌'} {name}")
+    
+    failed = sum(1 for _, ok in results if not ok)
+    print("\n" + "=" * 40)
+    print(f"📊 Проверок поведения: {len(results)}, не пройдено: {failed}")
+    return failed == 0
+
+def main() -> int:
+    """Основная функция проверки"""
+    print("🔍 Проверка планов запросов TeammateBot")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = build_database(tmp_dir)
+        try:
+            seed(db)
+            queries = exercise(db)
+            plans_ok = check_plans(db, queries)
+            print()
+            behaviour_ok = check_behaviour(db)
+        finally:
+            db.close()
+    
+    if plans_ok and behaviour_ok:
+        print("🎉 Все запросы используют индексы")
+        return 0
+    
+    if not plans_ok:
+        print("⚠️  Есть запросы с полным проходом по таблице. Добавьте индекс в database/schema.py")
+    if not behaviour_ok:
+        print("⚠️  Поведение FSM или архивации не совпадает с ожидаемым")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -5,6 +5,7 @@
 
 import os
 import logging
+from functools import lru_cache
 from typing import Dict
 
 logger = logging.getLogger(__name__)
@@ -17,13 +18,98 @@ class Settings:
         self.BOT_TOKEN: str = os.getenv("BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
         self.ADMIN_ID: int = int(os.getenv("ADMIN_ID", "123456789"))
         
+        # Режим получения обновлений: "polling" или "webhook"
+        self.BOT_MODE: str = os.getenv("BOT_MODE", "polling")
+        
+        # Webhook: публичный адрес, путь, секрет и адрес, на котором слушает aiohttp
+        self.WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")  # например https://bot.example.com
+        self.WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
+        self.WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+        self.WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        self.WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+        self.WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+        self.WEBHOOK_SHUTDOWN_TIMEOUT: float = float(os.getenv("WEBHOOK_SHUTDOWN_TIMEOUT", "30"))  # сек
+        
+        # Файл для записи входящих обновлений (пусто - не записывать)
+        self.UPDATES_RECORD_PATH: str = os.getenv("UPDATES_RECORD_PATH", "")
+        
         # Каналы для проверки подписки
         self.DOTA_CHANNEL_ID: str = os.getenv("DOTA_CHANNEL_ID", "@your_dota_channel")
         self.CS_CHANNEL_ID: str = os.getenv("CS_CHANNEL_ID", "@your_cs_channel")
         
+        # Кэш проверок подписки: время жизни подписки и ее отсутствия (сек), размер,
+        # период фоновой перепроверки (сек, 0 - выкл) и ее скорость (запросов/сек)
+        self.SUBSCRIPTION_TTL: int = int(os.getenv("SUBSCRIPTION_TTL", "600"))
+        self.SUBSCRIPTION_NEGATIVE_TTL: int = int(os.getenv("SUBSCRIPTION_NEGATIVE_TTL", "30"))
+        self.SUBSCRIPTION_CACHE_SIZE: int = int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "50000"))
+        self.SUBSCRIPTION_REVALIDATE_INTERVAL: int = int(os.getenv("SUBSCRIPTION_REVALIDATE_INTERVAL", "60"))
+        self.SUBSCRIPTION_REVALIDATE_RATE: float = float(os.getenv("SUBSCRIPTION_REVALIDATE_RATE", "10"))
+        
         # База данных
         self.DATABASE_PATH: str = os.getenv("DATABASE_PATH", "data/teammates.db")
         
+        # Пул соединений и PRAGMA настройки SQLite
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_JOURNAL_MODE: str = os.getenv("DB_JOURNAL_MODE", "WAL")
+        self.DB_SYNCHRONOUS: str = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+        self.DB_CACHE_SIZE: int = int(os.getenv("DB_CACHE_SIZE", "-16000"))  # отрицательное значение - в КиБ
+        self.DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+        self.DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+        self.DB_BUSY_TIMEOUT: int = int(os.getenv("DB_BUSY_TIMEOUT", "5000"))  # мс
+        self.MIGRATION_BATCH_SIZE: int = int(os.getenv("MIGRATION_BATCH_SIZE", "1000"))
+        
+        # Хранилище состояний FSM: "sqlite" (таблица в основной БД) или "memory"
+        self.FSM_STORAGE: str = os.getenv("FSM_STORAGE", "sqlite")
+        self.FSM_TTL: int = int(os.getenv("FSM_TTL", str(7 * 24 * 3600)))  # сек без обновлений до удаления
+        self.FSM_FLUSH_INTERVAL: float = float(os.getenv("FSM_FLUSH_INTERVAL", "1"))  # 0 - запись сразу
+        self.FSM_FLUSH_SIZE: int = int(os.getenv("FSM_FLUSH_SIZE", "200"))
+        
+        # Отложенная запись активности: период сброса (сек) и размер буфера
+        self.ACTIVITY_FLUSH_INTERVAL: int = int(os.getenv("ACTIVITY_FLUSH_INTERVAL", "30"))
+        self.ACTIVITY_FLUSH_SIZE: int = int(os.getenv("ACTIVITY_FLUSH_SIZE", "500"))
+        
+        # Время жизни кэша статистики (сек)
+        self.STATS_CACHE_TTL: int = int(os.getenv("STATS_CACHE_TTL", "60"))
+        
+        # Кэш анкет: максимальное число записей и время жизни (сек)
+        self.PROFILE_CACHE_SIZE: int = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+        self.PROFILE_CACHE_TTL: int = int(os.getenv("PROFILE_CACHE_TTL", "60"))
+        # Кэш готовых карточек анкет: максимальное число записей
+        self.CARD_CACHE_SIZE: int = int(os.getenv("CARD_CACHE_SIZE", "10000"))
+        
+        # Просмотр анкет: размер подгружаемой страницы и остаток очереди, при котором грузится следующая
+        self.SEARCH_PAGE_SIZE: int = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+        self.SEARCH_PREFETCH_THRESHOLD: int = int(os.getenv("SEARCH_PREFETCH_THRESHOLD", "2"))
+        # Сколько следующих анкет заранее готовить в фоне, пока пользователь смотрит текущую
+        self.SEARCH_PREFETCH_DEPTH: int = int(os.getenv("SEARCH_PREFETCH_DEPTH", "3"))
+        # Для скольких пользователей одновременно хранить подготовленные анкеты
+        self.SEARCH_PREFETCH_USERS: int = int(os.getenv("SEARCH_PREFETCH_USERS", "10000"))
+        
+        # Архивация: сколько дней без активности до переноса в архив, период запуска (сек, 0 - выкл)
+        self.ARCHIVE_INACTIVE_DAYS: int = int(os.getenv("ARCHIVE_INACTIVE_DAYS", "14"))
+        self.ARCHIVE_INTERVAL: int = int(os.getenv("ARCHIVE_INTERVAL", "3600"))
+        self.ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+        
+        # Очистка: сколько дней без активности до удаления и размер пачки удаления
+        self.PURGE_INACTIVE_DAYS: int = int(os.getenv("PURGE_INACTIVE_DAYS", "30"))
+        self.PURGE_BATCH_SIZE: int = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+        
+        # Матчей на одной странице списка
+        self.MATCHES_PAGE_SIZE: int = int(os.getenv("MATCHES_PAGE_SIZE", "10"))
+        
+        # Уведомления: общий лимит (сообщений/сек), интервал для одного чата и окно
+        # группировки лайков (сек), повторы с экспоненциальной задержкой, число воркеров
+        self.NOTIFY_RATE: float = float(os.getenv("NOTIFY_RATE", "25"))
+        self.NOTIFY_CHAT_INTERVAL: float = float(os.getenv("NOTIFY_CHAT_INTERVAL", "1"))
+        self.NOTIFY_COALESCE_WINDOW: float = float(os.getenv("NOTIFY_COALESCE_WINDOW", "3"))
+        self.NOTIFY_MAX_RETRIES: int = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+        self.NOTIFY_BACKOFF: float = float(os.getenv("NOTIFY_BACKOFF", "1"))
+        self.NOTIFY_WORKERS: int = int(os.getenv("NOTIFY_WORKERS", "4"))
+        self.NOTIFY_SHUTDOWN_TIMEOUT: float = float(os.getenv("NOTIFY_SHUTDOWN_TIMEOUT", "5"))
+        # Лайки: "digest" - не чаще одного сообщения за окно (сек), "instant" - сразу
+        self.NOTIFY_LIKES_MODE: str = os.getenv("NOTIFY_LIKES_MODE", "digest")
+        self.NOTIFY_DIGEST_WINDOW: int = int(os.getenv("NOTIFY_DIGEST_WINDOW", "1800"))
+        
         # Лимиты
         self.MAX_NAME_LENGTH: int = int(os.getenv("MAX_NAME_LENGTH", "50"))
         self.MAX_NICKNAME_LENGTH: int = int(os.getenv("MAX_NICKNAME_LENGTH", "30"))
@@ -85,6 +171,23 @@ class Settings:
         if len(self.BOT_TOKEN) < 40:
             errors.append("BOT_TOKEN выглядит некорректно")
         
+        if self.BOT_MODE not in ("polling", "webhook"):
+            errors.append(f"BOT_MODE должен быть polling или webhook, получено: {self.BOT_MODE}")
+        
+        if self.BOT_MODE == "webhook":
+            if not self.WEBHOOK_PATH.startswith("/"):
+                errors.append("WEBHOOK_PATH должен начинаться с /")
+            if not self.WEBHOOK_URL:
+                logger.warning("⚠️ WEBHOOK_URL не задан: webhook нужно зарегистрировать вручную")
+            if not self.WEBHOOK_SECRET:
+                logger.warning("⚠️ WEBHOOK_SECRET не задан: запросы к webhook не проверяются")
+        
+        if self.NOTIFY_LIKES_MODE not in ("digest", "instant"):
+            errors.append(f"NOTIFY_LIKES_MODE должен быть digest или instant, получено: {self.NOTIFY_LIKES_MODE}")
+        
+        if self.FSM_STORAGE not in ("sqlite", "memory"):
+            errors.append(f"FSM_STORAGE должен быть sqlite или memory, получено: {self.FSM_STORAGE}")
+        
         if self.ADMIN_ID == 123456789:
             logger.warning("⚠️ ADMIN_ID не изменен с значения по умолчанию")
         
@@ -118,4 +221,9 @@ class Settings:
             return self.DOTA_CHANNEL_ID
         elif game == "cs":
             return self.CS_CHANNEL_ID
-        return ""
\ No newline at end of file
+        return ""
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Общий экземпляр настроек: окружение читается один раз за процесс"""
+    return Settings()
\ No newline at end of file
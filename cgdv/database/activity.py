@@ -0,0 +1,45 @@
+# database/activity.py
+"""
+Буфер отложенной записи времени последней активности
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+# Формат совпадает с CURRENT_TIMESTAMP в SQLite (UTC)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def activity_cutoff(days: float) -> str:
+    """Граница неактивности: момент ``days`` дней назад в формате last_activity"""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime(TIMESTAMP_FORMAT)
+
+class ActivityBuffer:
+    """Накопитель отметок активности.
+    
+    Для каждого пользователя хранится только последняя отметка, а в базу
+    они записываются одной пачкой по таймеру или при переполнении буфера.
+    """
+    
+    def __init__(self, max_pending: int = 500):
+        self.max_pending = max(1, max_pending)
+        self._pending: Dict[int, str] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, telegram_id: int) -> bool:
+        """Отметить активность. Возвращает True, если пора сбросить буфер"""
+        timestamp = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        
+        with self._lock:
+            self._pending[telegram_id] = timestamp
+            return len(self._pending) >= self.max_pending
+    
+    def drain(self) -> List[Tuple[str, int]]:
+        """Забрать накопленные отметки в виде (last_activity, telegram_id)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        
+        return [(timestamp, telegram_id) for telegram_id, timestamp in pending.items()]
+    
+    def __len__(self) -> int:
+        return len(self._pending)
\ No newline at end of file
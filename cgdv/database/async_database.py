@@ -0,0 +1,267 @@
+# database/async_database.py
+"""
+Асинхронная обертка над базой данных для обработчиков aiogram
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional, Dict, Any, Callable, Set, Tuple, TypeVar
+
+from config.settings import get_settings
+from database.activity import ActivityBuffer, activity_cutoff
+from database.database import Database, LikeResult
+from database.search_session import SearchCursor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class AsyncDatabase:
+    """Неблокирующий доступ к базе данных.
+    
+    Все запросы выполняются в отдельном пуле потоков, размер которого
+    совпадает с размером пула соединений, поэтому event loop не ждет диск.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        settings = get_settings()
+        self.db = db or Database()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.DB_POOL_SIZE,
+            thread_name_prefix="db"
+        )
+        
+        # Отложенная запись активности
+        self.activity = ActivityBuffer(max_pending=settings.ACTIVITY_FLUSH_SIZE)
+        self._activity_interval = settings.ACTIVITY_FLUSH_INTERVAL
+        self._activity_task: Optional[asyncio.Task] = None
+        self._archive_task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+    
+    async def _run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Выполнение синхронного метода в пуле потоков"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    def _spawn(self, coro):
+        """Запуск фоновой задачи с сохранением ссылки на нее"""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    def start_activity_flusher(self):
+        """Запуск периодического сброса буфера активности"""
+        if self._activity_task is None:
+            self._activity_task = asyncio.create_task(self._activity_loop())
+    
+    async def _activity_loop(self):
+        """Периодический сброс буфера активности"""
+        while True:
+            await asyncio.sleep(self._activity_interval)
+            try:
+                await self.flush_activity()
+            except Exception as e:
+                logger.error(f"Ошибка сброса активности: {e}")
+    
+    def start_archiver(self, interval: float, inactive_days: float, batch_size: int = 500):
+        """Запуск периодического переноса неактивных пользователей в архив"""
+        if self._archive_task is None and interval > 0:
+            self._archive_task = asyncio.create_task(
+                self._archive_loop(interval, inactive_days, batch_size)
+            )
+    
+    async def _archive_loop(self, interval: float, inactive_days: float, batch_size: int):
+        """Периодическая архивация неактивных пользователей"""
+        while True:
+            try:
+                await self.archive_inactive_users(activity_cutoff(inactive_days), batch_size)
+            except Exception as e:
+                logger.error(f"Ошибка архивации пользователей: {e}")
+            await asyncio.sleep(interval)
+    
+    async def flush_activity(self):
+        """Записать накопленные отметки активности одной пачкой"""
+        activity = self.activity.drain()
+        if activity:
+            await self._run(self.db.update_last_activity_batch, activity)
+    
+    def close(self):
+        """Остановка фоновых задач, сброс буфера и закрытие соединений"""
+        for task in (self._activity_task, self._archive_task):
+            if task is not None:
+                task.cancel()
+        self._activity_task = None
+        self._archive_task = None
+        
+        self._executor.shutdown(wait=True)
+        
+        # Гарантированно сохраняем активность перед выходом
+        activity = self.activity.drain()
+        if activity:
+            updated = self.db.update_last_activity_batch(activity)
+            logger.info(f"💾 Активность сохранена при остановке: {updated}")
+        
+        self.db.close()
+    
+    async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Получение пользователя по Telegram ID"""
+        # Попадание в кэш отдаем сразу, без перехода в пул потоков
+        user = self.db.profile_cache.get(telegram_id)
+        if user is not None:
+            return user
+        return await self._run(self.db.fetch_user, telegram_id)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Метрики кэша анкет"""
+        return self.db.get_cache_stats()
+    
+    async def create_user(self, telegram_id: int, username: str, game: str) -> bool:
+        """Создание нового пользователя"""
+        return await self._run(self.db.create_user, telegram_id, username, game)
+    
+    async def update_user_profile(self, telegram_id: int, name: str, nickname: str,
+                                  age: int, rating: str, positions: List[str],
+                                  additional_info: str, photo_id: str = None) -> bool:
+        """Обновление профиля пользователя"""
+        return await self._run(
+            self.db.update_user_profile, telegram_id, name, nickname,
+            age, rating, positions, additional_info, photo_id
+        )
+    
+    async def delete_user_profile(self, telegram_id: int) -> bool:
+        """Удаление профиля пользователя"""
+        return await self._run(self.db.delete_user_profile, telegram_id)
+    
+    async def delete_users(self, telegram_ids: List[int]) -> int:
+        """Удаление нескольких пользователей одной транзакцией"""
+        return await self._run(self.db.delete_users, telegram_ids)
+    
+    async def purge_inactive_users(self, before: str, batch_size: int = 500,
+                                   pause: float = 0.05) -> int:
+        """Удаление пользователей без активности с ``before`` пачками.
+        
+        Каждая пачка - отдельная транзакция, между пачками база свободна
+        для запросов обработчиков. Возвращает число удаленных пользователей.
+        """
+        # Свежие отметки активности должны попасть в базу до выбора пачек
+        await self.flush_activity()
+        
+        total = 0
+        while True:
+            deleted = await self._run(self.db.purge_inactive_batch, before, batch_size)
+            total += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(pause)
+        
+        if total:
+            logger.info(f"🧹 Удалено неактивных пользователей: {total}")
+        return total
+    
+    async def archive_inactive_users(self, before: str, batch_size: int = 500,
+                                     pause: float = 0.05) -> int:
+        """Перенос пользователей без активности с ``before`` в архив пачками.
+        
+        Возвращает число перенесенных пользователей.
+        """
+        await self.flush_activity()
+        
+        total = 0
+        while True:
+            moved = await self._run(self.db.archive_inactive_batch, before, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+            await asyncio.sleep(pause)
+        
+        logger.info(f"📦 Перенесено в архив неактивных пользователей: {total}")
+        return total
+    
+    async def restore_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Возврат пользователя из архива. None, если в архиве его нет"""
+        return await self._run(self.db.restore_user, telegram_id)
+    
+    async def fetch_search_page(self, user_id: int, cursor: SearchCursor, rating_filter: str = None,
+                                position_filter: str = None, limit: int = 10) -> List[int]:
+        """Следующая страница кандидатов для курсора поиска"""
+        return await self._run(
+            self.db.fetch_search_page, user_id, cursor, rating_filter, position_filter, limit
+        )
+    
+    async def add_like(self, from_user_id: int, to_user_id: int) -> LikeResult:
+        """Добавление лайка с проверкой на взаимность в одной транзакции"""
+        return await self._run(self.db.add_like, from_user_id, to_user_id)
+    
+    async def has_like(self, from_user_id: int, to_user_id: int) -> bool:
+        """Проверка, поставлен ли уже лайк"""
+        return await self._run(self.db.has_like, from_user_id, to_user_id)
+    
+    async def get_users_who_liked_me(self, user_id: int) -> List[Dict[str, Any]]:
+        """Получение пользователей, которые лайкнули меня"""
+        return await self._run(self.db.get_users_who_liked_me, user_id)
+    
+    async def get_like_inbox_next(self, user_id: int, before: Optional[Tuple[str, int]] = None
+                                  ) -> Optional[Tuple[Dict[str, Any], Tuple[str, int]]]:
+        """Следующий непросмотренный входящий лайк"""
+        return await self._run(self.db.get_like_inbox_next, user_id, before)
+    
+    async def mark_like_reviewed(self, user_id: int, from_user_id: int) -> Optional[Tuple[str, int]]:
+        """Отметить входящий лайк просмотренным"""
+        return await self._run(self.db.mark_like_reviewed, user_id, from_user_id)
+    
+    async def get_unread_likes(self, user_id: int) -> int:
+        """Количество непросмотренных входящих лайков"""
+        return await self._run(self.db.get_unread_likes, user_id)
+    
+    async def mark_likes_seen(self, user_id: int):
+        """Сбросить счетчик непросмотренных лайков"""
+        await self._run(self.db.mark_likes_seen, user_id)
+    
+    async def claim_likes_digest(self, user_id: int, now: int, window: int) -> Tuple[int, Optional[int]]:
+        """Занять слот дайджеста лайков для пользователя"""
+        return await self._run(self.db.claim_likes_digest, user_id, now, window)
+    
+    async def get_matches_page(self, user_id: int, limit: int = 10,
+                               after_match_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Страница матчей пользователя, от новых к старым"""
+        return await self._run(self.db.get_matches_page, user_id, limit, after_match_id)
+    
+    async def get_last_match(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Последний матч пользователя"""
+        return await self._run(self.db.get_last_match, user_id)
+    
+    async def count_matches(self, user_id: int) -> int:
+        """Количество активных матчей пользователя"""
+        return await self._run(self.db.count_matches, user_id)
+    
+    async def get_stats(self) -> Dict[str, int]:
+        """Получение статистики"""
+        return await self._run(self.db.get_stats)
+    
+    async def get_recent_users(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Получение последних зарегистрированных пользователей"""
+        return await self._run(self.db.get_recent_users, limit)
+    
+    async def count_inactive_users(self, since: str) -> int:
+        """Количество пользователей без активности с указанного момента"""
+        return await self._run(self.db.count_inactive_users, since)
+    
+    async def update_last_activity(self, telegram_id: int):
+        """Обновление времени последней активности (через буфер, без запроса к БД)"""
+        if self.activity.record(telegram_id):
+            self._spawn(self.flush_activity())
+    
+    async def get_fsm_session(self, key: str, not_before: int) -> Optional[Tuple[Optional[str], str]]:
+        """Состояние и данные FSM (JSON) по ключу, если сессия не просрочена"""
+        return await self._run(self.db.get_fsm_session, key, not_before)
+    
+    async def save_fsm_sessions(self, sessions: List[Tuple[str, bool, Optional[str], Optional[str], int]],
+                                not_before: int = 0) -> int:
+        """Пакетная запись сессий FSM"""
+        return await self._run(self.db.save_fsm_sessions, sessions, not_before)
+    
+    async def purge_fsm_sessions(self, before: int) -> int:
+        """Удаление просроченных сессий FSM"""
+        return await self._run(self.db.purge_fsm_sessions, before)
\ No newline at end of file
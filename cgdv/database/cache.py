@@ -0,0 +1,103 @@
+# database/cache.py
+"""
+LRU-кэш анкет пользователей с ограничением времени жизни
+"""
+
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class ProfileCache:
+    """Кэш анкет по telegram_id (LRU + TTL) со счетчиками попаданий"""
+    
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._items: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Растет при каждой инвалидации: запись, прочитанная до нее, не попадет в кэш
+        self._generation = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Анкета из кэша или None"""
+        with self._lock:
+            item = self._items.get(telegram_id)
+            
+            if item is None:
+                self.misses += 1
+                return None
+            
+            stored_at, user = item
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._items[telegram_id]
+                self.misses += 1
+                return None
+            
+            self._items.move_to_end(telegram_id)
+            self.hits += 1
+        
+        # Копия, чтобы обработчики не испортили закэшированные данные
+        return copy.deepcopy(user)
+    
+    @property
+    def generation(self) -> int:
+        """Текущее поколение кэша (снимается перед чтением из БД)"""
+        return self._generation
+    
+    def put(self, telegram_id: int, user: Dict[str, Any], generation: Optional[int] = None):
+        """Сохранить анкету в кэш, если с момента чтения не было инвалидации"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            
+            self._items[telegram_id] = (time.monotonic(), copy.deepcopy(user))
+            self._items.move_to_end(telegram_id)
+            
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, telegram_id: int):
+        """Удалить анкету из кэша"""
+        with self._lock:
+            self._items.pop(telegram_id, None)
+            self._generation += 1
+    
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._items.clear()
+            self._generation += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Метрики кэша"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+# Кэш общий для всех экземпляров Database, работающих с одним файлом БД,
+# иначе инвалидация в одном обработчике не увидится в другом
+_shared_caches: Dict[str, ProfileCache] = {}
+_shared_lock = threading.Lock()
+
+def get_profile_cache(db_path: str, max_size: int, ttl: float) -> ProfileCache:
+    """Общий кэш анкет для файла БД"""
+    with _shared_lock:
+        cache = _shared_caches.get(db_path)
+        if cache is None:
+            cache = ProfileCache(max_size=max_size, ttl=ttl)
+            _shared_caches[db_path] = cache
+        return cache
\ No newline at end of file
@@ -6,124 +6,143 @@
 import sqlite3
 import json
 import os
+import random
 import logging
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from enum import Enum
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 
-from config.settings import Settings
+from config.settings import get_settings
+from database import migrations
+from database.schema import USER_COLUMNS
+from database.cache import get_profile_cache
+from database.pool import ConnectionPool
+from database.search_session import SearchCursor
+from database.stats import StatsService
 
 logger = logging.getLogger(__name__)
 
+class LikeResult(Enum):
+    """Результат добавления лайка"""
+    LIKED = "liked"          # новый лайк без взаимности
+    MATCHED = "matched"      # новый лайк, образовавший матч
+    DUPLICATE = "duplicate"  # лайк уже был поставлен ранее
+    ERROR = "error"          # ошибка базы данных
+
 class Database:
     """Класс для работы с базой данных"""
     
     def __init__(self):
-        settings = Settings()
+        settings = get_settings()
         self.db_path = settings.DATABASE_PATH
         
         # Создаем папку для БД если её нет
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
+        # Пул переиспользуемых соединений вместо connect/close на каждый запрос
+        self.pool = ConnectionPool(
+            self.db_path,
+            pool_size=settings.DB_POOL_SIZE,
+            journal_mode=settings.DB_JOURNAL_MODE,
+            synchronous=settings.DB_SYNCHRONOUS,
+            cache_size=settings.DB_CACHE_SIZE,
+            mmap_size=settings.DB_MMAP_SIZE,
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            busy_timeout=settings.DB_BUSY_TIMEOUT
+        )
+        
+        self.migration_batch_size = settings.MIGRATION_BATCH_SIZE
+        self.profile_cache = get_profile_cache(
+            self.db_path,
+            max_size=settings.PROFILE_CACHE_SIZE,
+            ttl=settings.PROFILE_CACHE_TTL
+        )
+        self.stats = StatsService(self._execute_query, ttl=settings.STATS_CACHE_TTL)
+        
         self.init_database()
         logger.info(f"📁 База данных инициализирована: {self.db_path}")
     
     def init_database(self):
         """Инициализация структуры базы данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Таблица пользователей
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE NOT NULL,
-                username TEXT,
-                game TEXT NOT NULL,
-                name TEXT,
-                nickname TEXT,
-                age INTEGER,
-                rating TEXT,
-                positions TEXT,
-                additional_info TEXT,
-                photo_id TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица лайков
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS likes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                from_user_id INTEGER NOT NULL,
-                to_user_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(from_user_id, to_user_id),
-                FOREIGN KEY (from_user_id) REFERENCES users (telegram_id),
-                FOREIGN KEY (to_user_id) REFERENCES users (telegram_id)
-            )
-        ''')
-        
-        # Таблица матчей (взаимные лайки)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS matches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user1_id INTEGER NOT NULL,
-                user2_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT 1,
-                UNIQUE(user1_id, user2_id),
-                FOREIGN KEY (user1_id) REFERENCES users (telegram_id),
-                FOREIGN KEY (user2_id) REFERENCES users (telegram_id)
-            )
-        ''')
-        
-        # Индексы для производительности
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_game ON users(game)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_active ON users(is_active)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_likes_from_user ON likes(from_user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_likes_to_user ON likes(to_user_id)')
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            version = migrations.migrate(conn, self.migration_batch_size)
+            logger.info(f"🗄️ Версия схемы БД: {version}")
+    
+    def close(self):
+        """Закрытие всех соединений с базой данных"""
+        self.pool.close()
     
     def _execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """Выполнение SQL запроса с обработкой ошибок"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(query, params)
-            
-            if query.strip().upper().startswith('SELECT'):
-                result = cursor.fetchall()
-            else:
+            with self.pool.connection() as conn:
+                cursor = conn.execute(query, params)
+                
+                if query.strip().upper().startswith('SELECT'):
+                    return cursor.fetchall()
+                
                 conn.commit()
-                result = cursor.rowcount
-            
-            conn.close()
-            return result
+                return cursor.rowcount
             
         except sqlite3.Error as e:
             logger.error(f"Ошибка базы данных: {e}")
-            if 'conn' in locals():
-                conn.close()
             return []
     
+    @contextmanager
+    def _transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """Несколько запросов в одной транзакции на одном соединении.
+        
+        ``immediate`` сразу берет блокировку на запись, чтобы параллельные
+        транзакции, читающие и пишущие одни строки, выполнялись по очереди.
+        """
+        with self.pool.connection() as conn:
+            if immediate:
+                conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    @staticmethod
+    def _row_to_user(row: sqlite3.Row) -> Dict[str, Any]:
+        """Преобразование строки users в словарь с распарсенными позициями"""
+        user_dict = dict(row)
+        if user_dict.get('positions'):
+            try:
+                user_dict['positions'] = json.loads(user_dict['positions'])
+            except (TypeError, ValueError):
+                user_dict['positions'] = []
+        else:
+            user_dict['positions'] = []
+        return user_dict
+    
     def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
-        """Получение пользователя по Telegram ID"""
+        """Получение пользователя по Telegram ID (через кэш анкет)"""
+        user = self.profile_cache.get(telegram_id)
+        if user is not None:
+            return user
+        return self.fetch_user(telegram_id)
+    
+    def fetch_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Чтение пользователя из БД в обход кэша с сохранением в кэш"""
+        generation = self.profile_cache.generation
         result = self._execute_query(
             "SELECT * FROM users WHERE telegram_id = ?", 
             (telegram_id,)
         )
         
         if result:
-            return dict(result[0])
+            user = self._row_to_user(result[0])
+            self.profile_cache.put(telegram_id, user, generation)
+            return user
         return None
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Метрики кэша анкет"""
+        return self.profile_cache.stats()
+    
     def create_user(self, telegram_id: int, username: str, game: str) -> bool:
         """Создание нового пользователя"""
         try:
@@ -131,6 +150,7 @@ class Database:
                 "INSERT INTO users (telegram_id, username, game) VALUES (?, ?, ?)",
                 (telegram_id, username, game)
             )
+            self.profile_cache.invalidate(telegram_id)
             logger.info(f"👤 Создан новый пользователь: {telegram_id} ({game})")
             return True
         except Exception as e:
@@ -148,55 +168,187 @@ class Database:
                 UPDATE users SET 
                 name = ?, nickname = ?, age = ?, rating = ?, 
                 positions = ?, additional_info = ?, photo_id = ?,
-                last_activity = CURRENT_TIMESTAMP
+                last_activity = CURRENT_TIMESTAMP,
+                profile_version = profile_version + 1
                 WHERE telegram_id = ?
             '''
             
-            self._execute_query(query, (
-                name, nickname, age, rating, positions_json, 
-                additional_info, photo_id, telegram_id
-            ))
+            with self._transaction() as conn:
+                conn.execute(query, (
+                    name, nickname, age, rating, positions_json, 
+                    additional_info, photo_id, telegram_id
+                ))
+                
+                conn.execute(
+                    "DELETE FROM user_positions WHERE telegram_id = ?",
+                    (telegram_id,)
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO user_positions (telegram_id, position) VALUES (?, ?)",
+                    [(telegram_id, position) for position in positions]
+                )
             
+            self.profile_cache.invalidate(telegram_id)
             logger.info(f"✅ Обновлен профиль пользователя: {telegram_id}")
             return True
         except Exception as e:
             logger.error(f"Ошибка обновления профиля: {e}")
             return False
     
+    # Ссылки на пользователя в порядке удаления; каждый столбец покрыт индексом,
+    # поэтому каждый DELETE - поиск по индексу, а не проход по таблице
+    USER_REFERENCES = (
+        ("likes", "from_user_id"),
+        ("likes", "to_user_id"),
+        ("matches", "user1_id"),
+        ("matches", "user2_id"),
+        ("user_positions", "telegram_id"),
+        ("like_inbox", "telegram_id"),
+        ("users_archive", "telegram_id"),
+    )
+    
+    def _delete_users(self, conn: sqlite3.Connection, telegram_ids: List[int]) -> int:
+        """Удаление пользователей со всеми ссылками в открытой транзакции"""
+        if not telegram_ids:
+            return 0
+        
+        params = [(telegram_id,) for telegram_id in telegram_ids]
+        for table, column in self.USER_REFERENCES:
+            conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", params)
+        
+        cursor = conn.executemany("DELETE FROM users WHERE telegram_id = ?", params)
+        return cursor.rowcount
+    
     def delete_user_profile(self, telegram_id: int) -> bool:
-        """Удаление профиля пользователя"""
+        """Удаление профиля пользователя одной транзакцией"""
         try:
-            # Удаляем лайки
-            self._execute_query(
-                "DELETE FROM likes WHERE from_user_id = ? OR to_user_id = ?",
-                (telegram_id, telegram_id)
-            )
-            
-            # Удаляем матчи
-            self._execute_query(
-                "DELETE FROM matches WHERE user1_id = ? OR user2_id = ?",
-                (telegram_id, telegram_id)
-            )
-            
-            # Удаляем пользователя
-            self._execute_query(
-                "DELETE FROM users WHERE telegram_id = ?",
-                (telegram_id,)
-            )
-            
-            logger.info(f"🗑️ Удален профиль пользователя: {telegram_id}")
-            return True
-        except Exception as e:
+            with self._transaction(immediate=True) as conn:
+                self._delete_users(conn, [telegram_id])
+        except sqlite3.Error as e:
             logger.error(f"Ошибка удаления профиля: {e}")
             return False
+        
+        self.profile_cache.invalidate(telegram_id)
+        logger.info(f"🗑️ Удален профиль пользователя: {telegram_id}")
+        return True
     
-    def get_potential_matches(self, user_id: int, rating_filter: str = None, 
-                            position_filter: str = None, limit: int = 10) -> List[Dict[str, Any]]:
-        """Получение потенциальных совпадений с фильтрами"""
-        user = self.get_user(user_id)
-        if not user:
-            return []
+    def delete_users(self, telegram_ids: List[int]) -> int:
+        """Удаление нескольких пользователей одной транзакцией"""
+        try:
+            with self._transaction(immediate=True) as conn:
+                deleted = self._delete_users(conn, telegram_ids)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка удаления пользователей: {e}")
+            return 0
+        
+        for telegram_id in telegram_ids:
+            self.profile_cache.invalidate(telegram_id)
+        return deleted
+    
+    def purge_inactive_batch(self, before: str, batch_size: int = 500) -> int:
+        """Удаление одной пачки пользователей без активности с ``before``.
+        
+        Пачка выбирается из users и из архива и удаляется в одной короткой
+        транзакции, так что блокировка на запись держится только на время
+        одной пачки.
+        """
+        try:
+            with self._transaction(immediate=True) as conn:
+                telegram_ids = [row['telegram_id'] for row in conn.execute(
+                    "SELECT telegram_id FROM users WHERE last_activity < ? LIMIT ?",
+                    (before, batch_size)
+                )]
+                if len(telegram_ids) < batch_size:
+                    telegram_ids += [row['telegram_id'] for row in conn.execute(
+                        "SELECT telegram_id FROM users_archive WHERE last_activity < ? LIMIT ?",
+                        (before, batch_size - len(telegram_ids))
+                    )]
+                self._delete_users(conn, telegram_ids)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка очистки неактивных пользователей: {e}")
+            return 0
+        
+        for telegram_id in telegram_ids:
+            self.profile_cache.invalidate(telegram_id)
+        return len(telegram_ids)
+    
+    def archive_inactive_batch(self, before: str, batch_size: int = 500) -> int:
+        """Перенос одной пачки пользователей без активности с ``before`` в архив.
+        
+        Лайки и матчи остаются на месте: пока пользователя нет в users, они
+        не попадают в выборки, а после восстановления снова видны.
+        """
+        columns = ", ".join(USER_COLUMNS)
+        
+        try:
+            with self._transaction(immediate=True) as conn:
+                telegram_ids = [row['telegram_id'] for row in conn.execute(
+                    "SELECT telegram_id FROM users WHERE last_activity < ? LIMIT ?",
+                    (before, batch_size)
+                )]
+                params = [(telegram_id,) for telegram_id in telegram_ids]
+                
+                conn.executemany("DELETE FROM users_archive WHERE telegram_id = ?", params)
+                conn.executemany(
+                    f"INSERT INTO users_archive ({columns}) "
+                    f"SELECT {columns} FROM users WHERE telegram_id = ?",
+                    params
+                )
+                conn.executemany("DELETE FROM user_positions WHERE telegram_id = ?", params)
+                conn.executemany("DELETE FROM users WHERE telegram_id = ?", params)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка архивации пользователей: {e}")
+            return 0
+        
+        for telegram_id in telegram_ids:
+            self.profile_cache.invalidate(telegram_id)
+        return len(telegram_ids)
+    
+    def restore_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Возврат пользователя из архива. None, если в архиве его нет"""
+        columns = ", ".join(USER_COLUMNS)
+        
+        # Проверка по первичному ключу без блокировки на запись: обычно
+        # пользователя в архиве нет
+        if not self._execute_query("SELECT 1 FROM users_archive WHERE telegram_id = ?", (telegram_id,)):
+            return None
+        
+        try:
+            with self._transaction(immediate=True) as conn:
+                cursor = conn.execute(
+                    f"INSERT INTO users ({columns}) "
+                    f"SELECT {columns} FROM users_archive WHERE telegram_id = ?",
+                    (telegram_id,)
+                )
+                if not cursor.rowcount:
+                    return None
+                
+                conn.execute(
+                    "UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE telegram_id = ?",
+                    (telegram_id,)
+                )
+                
+                # Позиции восстанавливаются из JSON в users.positions
+                row = conn.execute(
+                    "SELECT * FROM users WHERE telegram_id = ?",
+                    (telegram_id,)
+                ).fetchone()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO user_positions (telegram_id, position) VALUES (?, ?)",
+                    [(telegram_id, position) for position in self._row_to_user(row)['positions']]
+                )
+                conn.execute("DELETE FROM users_archive WHERE telegram_id = ?", (telegram_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка восстановления пользователя из архива: {e}")
+            return None
         
+        self.profile_cache.invalidate(telegram_id)
+        logger.info(f"📤 Пользователь {telegram_id} возвращен из архива")
+        return self.fetch_user(telegram_id)
+    
+    def _potential_matches_query(self, user_id: int, game: str, rating_filter: str = None,
+                                 position_filter: str = None) -> Tuple[str, List[Any]]:
+        """Запрос кандидатов с фильтрами (без ORDER BY и LIMIT)"""
         # Базовый запрос
         query = '''
             SELECT * FROM users 
@@ -208,7 +360,7 @@ class Database:
                 SELECT to_user_id FROM likes WHERE from_user_id = ?
             )
         '''
-        params = [user_id, user['game'], user_id]
+        params = [user_id, game, user_id]
         
         # Добавляем фильтр по рейтингу
         if rating_filter:
@@ -217,83 +369,155 @@ class Database:
         
         # Добавляем фильтр по позиции
         if position_filter and position_filter != "any":
-            query += " AND (positions LIKE ? OR positions LIKE ?)"
-            params.extend([f'%"{position_filter}"%', f'%"any"%'])
+            query += '''
+            AND EXISTS (
+                SELECT 1 FROM user_positions p
+                WHERE p.telegram_id = users.telegram_id AND p.position IN (?, 'any')
+            )'''
+            params.append(position_filter)
         
-        query += " ORDER BY RANDOM() LIMIT ?"
-        params.append(limit)
+        return query, params
+    
+    def _random_pivot(self) -> Optional[int]:
+        """Случайная точка входа в диапазон id users (None, если таблица пуста)"""
+        bounds = self._execute_query(
+            "SELECT (SELECT MIN(id) FROM users) AS lo, (SELECT MAX(id) FROM users) AS hi"
+        )
+        if not bounds or bounds[0]['lo'] is None:
+            return None
+        return random.randint(bounds[0]['lo'], bounds[0]['hi'])
+    
+    def fetch_search_page(self, user_id: int, cursor: SearchCursor, rating_filter: str = None,
+                          position_filter: str = None, limit: int = 10) -> List[int]:
+        """Следующая страница кандидатов для курсора поиска.
         
-        result = self._execute_query(query, tuple(params))
+        Продвигает курсор, добавляет найденные id в его очередь и кладет
+        анкеты в кэш, чтобы показ не требовал отдельного запроса.
+        """
+        if cursor.exhausted or limit <= 0:
+            return []
+        
+        user = self.get_user(user_id)
+        if not user:
+            cursor.exhausted = True
+            return []
+        
+        if cursor.start_id is None:
+            pivot = self._random_pivot()
+            if pivot is None:
+                cursor.exhausted = True
+                return []
+            cursor.start_id = pivot
+            cursor.last_id = pivot - 1
         
-        users = []
-        for row in result:
-            user_dict = dict(row)
-            # Парсим позиции
-            if user_dict['positions']:
-                try:
-                    user_dict['positions'] = json.loads(user_dict['positions'])
-                except:
-                    user_dict['positions'] = []
+        query, params = self._potential_matches_query(
+            user_id, user['game'], rating_filter, position_filter
+        )
+        generation = self.profile_cache.generation
+        profiles = []
+        
+        # Keyset-проход по кольцу id: до конца таблицы, затем с начала до точки входа
+        while len(profiles) < limit and not cursor.exhausted:
+            need = limit - len(profiles)
+            if cursor.wrapped:
+                rows = self._execute_query(
+                    query + " AND id > ? AND id < ? ORDER BY id LIMIT ?",
+                    tuple(params) + (cursor.last_id, cursor.start_id, need)
+                )
             else:
-                user_dict['positions'] = []
-            users.append(user_dict)
+                rows = self._execute_query(
+                    query + " AND id > ? ORDER BY id LIMIT ?",
+                    tuple(params) + (cursor.last_id, need)
+                )
+            
+            for row in rows:
+                profiles.append(self._row_to_user(row))
+                cursor.last_id = row['id']
+            
+            if len(rows) < need:
+                if cursor.wrapped:
+                    cursor.exhausted = True
+                else:
+                    cursor.wrapped = True
+                    cursor.last_id = 0
+        
+        for profile in profiles:
+            self.profile_cache.put(profile['telegram_id'], profile, generation)
         
-        return users
+        ids = [profile['telegram_id'] for profile in profiles]
+        cursor.queue.extend(ids)
+        return ids
     
-    def add_like(self, from_user_id: int, to_user_id: int) -> bool:
-        """Добавление лайка. Возвращает True если это взаимный лайк"""
+    def add_like(self, from_user_id: int, to_user_id: int) -> LikeResult:
+        """Добавление лайка с проверкой на взаимность в одной транзакции"""
         try:
-            # Проверяем, не существует ли уже такой лайк
-            existing_like = self._execute_query(
-                "SELECT 1 FROM likes WHERE from_user_id = ? AND to_user_id = ?",
-                (from_user_id, to_user_id)
-            )
-            
-            if existing_like:
-                logger.warning(f"⚠️ Лайк уже существует: {from_user_id} -> {to_user_id}")
-                # Проверяем есть ли обратный лайк для определения матча
-                mutual_like = self._execute_query(
+            with self._transaction(immediate=True) as conn:
+                inserted = conn.execute('''
+                    INSERT INTO likes (from_user_id, to_user_id) VALUES (?, ?)
+                    ON CONFLICT (from_user_id, to_user_id) DO NOTHING
+                    RETURNING id
+                ''', (from_user_id, to_user_id)).fetchall()
+                
+                if not inserted:
+                    logger.warning(f"⚠️ Лайк уже существует: {from_user_id} -> {to_user_id}")
+                    return LikeResult.DUPLICATE
+                
+                # Проверяем взаимный лайк
+                mutual_like = conn.execute(
                     "SELECT 1 FROM likes WHERE from_user_id = ? AND to_user_id = ?",
                     (to_user_id, from_user_id)
+                ).fetchone()
+                
+                if not mutual_like:
+                    # Новый лайк во входящих получателя
+                    conn.execute('''
+                        INSERT INTO like_inbox (telegram_id, unread) VALUES (?, 1)
+                        ON CONFLICT (telegram_id) DO UPDATE SET unread = unread + 1
+                    ''', (to_user_id,))
+                    
+                    logger.info(f"👍 Лайк: {from_user_id} -> {to_user_id}")
+                    return LikeResult.LIKED
+                
+                # Оба лайка пары уходят из входящих: иначе они навсегда остаются
+                # в idx_likes_inbox, и выборка входящих перешагивает через них
+                conn.execute(
+                    "UPDATE likes SET reviewed_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (inserted[0]['id'],)
                 )
-                return bool(mutual_like)
-            
-            # Добавляем лайк
-            result = self._execute_query(
-                "INSERT INTO likes (from_user_id, to_user_id) VALUES (?, ?)",
-                (from_user_id, to_user_id)
-            )
-            
-            if not result:
-                logger.error(f"❌ Не удалось добавить лайк: {from_user_id} -> {to_user_id}")
-                return False
-            
-            # Проверяем взаимный лайк
-            mutual_like = self._execute_query(
-                "SELECT 1 FROM likes WHERE from_user_id = ? AND to_user_id = ?",
-                (to_user_id, from_user_id)
-            )
-            
-            if mutual_like:
+                answered = conn.execute('''
+                    UPDATE likes SET reviewed_at = CURRENT_TIMESTAMP
+                    WHERE from_user_id = ? AND to_user_id = ? AND reviewed_at IS NULL
+                ''', (to_user_id, from_user_id)).rowcount
+                
+                if answered:
+                    # Ответный лайк: входящий больше не ждет просмотра
+                    conn.execute(
+                        "UPDATE like_inbox SET unread = unread - 1 WHERE telegram_id = ? AND unread > 0",
+                        (from_user_id,)
+                    )
+                
                 # Создаем матч
                 user1_id = min(from_user_id, to_user_id)
                 user2_id = max(from_user_id, to_user_id)
-                
-                # Используем INSERT OR IGNORE чтобы избежать дублирования матчей
-                self._execute_query(
-                    "INSERT OR IGNORE INTO matches (user1_id, user2_id) VALUES (?, ?)",
-                    (user1_id, user2_id)
-                )
+                conn.execute('''
+                    INSERT INTO matches (user1_id, user2_id) VALUES (?, ?)
+                    ON CONFLICT (user1_id, user2_id) DO NOTHING
+                ''', (user1_id, user2_id))
                 
                 logger.info(f"💖 Создан матч: {from_user_id} <-> {to_user_id}")
-                return True
+                return LikeResult.MATCHED
             
-            logger.info(f"👍 Лайк: {from_user_id} -> {to_user_id}")
-            return False
-            
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"Ошибка добавления лайка: {e}")
-            return False
+            return LikeResult.ERROR
+    
+    def has_like(self, from_user_id: int, to_user_id: int) -> bool:
+        """Проверка, поставлен ли уже лайк"""
+        result = self._execute_query(
+            "SELECT 1 FROM likes WHERE from_user_id = ? AND to_user_id = ?",
+            (from_user_id, to_user_id)
+        )
+        return bool(result)
     
     def get_users_who_liked_me(self, user_id: int) -> List[Dict[str, Any]]:
         """Получение пользователей, которые лайкнули меня"""
@@ -310,89 +534,273 @@ class Database:
         
         result = self._execute_query(query, (user_id, user_id))
         
-        users = []
-        for row in result:
-            user_dict = dict(row)
-            # Парсим позиции
-            if user_dict['positions']:
-                try:
-                    user_dict['positions'] = json.loads(user_dict['positions'])
-                except:
-                    user_dict['positions'] = []
-            else:
-                user_dict['positions'] = []
-            users.append(user_dict)
-        
-        return users
+        return [self._row_to_user(row) for row in result]
     
-    def get_matches(self, user_id: int) -> List[Dict[str, Any]]:
-        """Получение матчей пользователя"""
+    def get_like_inbox_next(self, user_id: int, before: Optional[Tuple[str, int]] = None
+                            ) -> Optional[Tuple[Dict[str, Any], Tuple[str, int]]]:
+        """Следующий непросмотренный входящий лайк.
+        
+        Возвращает анкету лайкнувшего и позицию лайка (created_at, id), от
+        которой продолжать. ``before`` - позиция текущего лайка.
+        """
         query = '''
-            SELECT u.* FROM users u 
-            JOIN matches m ON (u.telegram_id = m.user1_id OR u.telegram_id = m.user2_id)
-            WHERE (m.user1_id = ? OR m.user2_id = ?) 
-            AND u.telegram_id != ?
-            AND m.is_active = 1
-            ORDER BY m.created_at DESC
+            SELECT u.*, l.created_at AS like_created_at, l.id AS like_id
+            FROM likes l
+            JOIN users u ON u.telegram_id = l.from_user_id
+            WHERE l.to_user_id = ?
+            AND l.reviewed_at IS NULL
         '''
+        params: List[Any] = [user_id]
         
-        result = self._execute_query(query, (user_id, user_id, user_id))
-        
-        users = []
-        for row in result:
-            user_dict = dict(row)
-            # Парсим позиции
-            if user_dict['positions']:
-                try:
-                    user_dict['positions'] = json.loads(user_dict['positions'])
-                except:
-                    user_dict['positions'] = []
-            else:
-                user_dict['positions'] = []
-            users.append(user_dict)
+        if before is not None:
+            query += " AND (l.created_at, l.id) < (?, ?)"
+            params.extend(before)
+        
+        query += '''
+            AND NOT EXISTS (
+                SELECT 1 FROM likes l2
+                WHERE l2.from_user_id = ? AND l2.to_user_id = l.from_user_id
+            )
+            ORDER BY l.created_at DESC, l.id DESC
+            LIMIT 1
+        '''
+        params.append(user_id)
         
-        return users
+        result = self._execute_query(query, tuple(params))
+        if not result:
+            return None
+        
+        profile = self._row_to_user(result[0])
+        position = (profile.pop('like_created_at'), profile.pop('like_id'))
+        return profile, position
     
-    def get_stats(self) -> Dict[str, int]:
-        """Получение статистики"""
-        stats = {}
+    def mark_like_reviewed(self, user_id: int, from_user_id: int) -> Optional[Tuple[str, int]]:
+        """Отметить входящий лайк просмотренным. Возвращает его позицию (created_at, id)"""
+        try:
+            with self._transaction() as conn:
+                row = conn.execute('''
+                    UPDATE likes SET reviewed_at = CURRENT_TIMESTAMP
+                    WHERE from_user_id = ? AND to_user_id = ?
+                    RETURNING created_at, id
+                ''', (from_user_id, user_id)).fetchone()
+                return (row['created_at'], row['id']) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка отметки лайка: {e}")
+            return None
+    
+    def get_unread_likes(self, user_id: int) -> int:
+        """Количество непросмотренных входящих лайков"""
+        result = self._execute_query(
+            "SELECT unread FROM like_inbox WHERE telegram_id = ?",
+            (user_id,)
+        )
+        return result[0]['unread'] if result else 0
+    
+    def mark_likes_seen(self, user_id: int):
+        """Сбросить счетчик непросмотренных лайков"""
+        self._execute_query(
+            "UPDATE like_inbox SET unread = 0 WHERE telegram_id = ? AND unread != 0",
+            (user_id,)
+        )
+    
+    def claim_likes_digest(self, user_id: int, now: int, window: int) -> Tuple[int, Optional[int]]:
+        """Занять слот дайджеста лайков для пользователя.
         
-        # Всего пользователей
-        total_users = self._execute_query("SELECT COUNT(*) as count FROM users")
-        stats['total_users'] = total_users[0]['count'] if total_users else 0
+        Возвращает (unread, None), если дайджест можно отправлять сейчас,
+        (0, когда можно) - если прошлый дайджест был меньше ``window`` секунд
+        назад, и (0, None) - если новых лайков нет.
+        """
+        try:
+            with self._transaction(immediate=True) as conn:
+                row = conn.execute(
+                    "SELECT unread, notified_at FROM like_inbox WHERE telegram_id = ?",
+                    (user_id,)
+                ).fetchone()
+                
+                if not row or row['unread'] <= 0:
+                    return 0, None
+                
+                if row['notified_at'] is not None and now < row['notified_at'] + window:
+                    return 0, row['notified_at'] + window
+                
+                conn.execute(
+                    "UPDATE like_inbox SET notified_at = ? WHERE telegram_id = ?",
+                    (now, user_id)
+                )
+                return row['unread'], None
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка дайджеста лайков: {e}")
+            return 0, None
+    
+    def get_matches_page(self, user_id: int, limit: int = 10,
+                         after_match_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Страница матчей пользователя, от новых к старым.
         
-        # По играм
-        dota_users = self._execute_query("SELECT COUNT(*) as count FROM users WHERE game = 'dota'")
-        stats['dota_users'] = dota_users[0]['count'] if dota_users else 0
+        Каждая сторона матча читается своим индексом (UNION ALL вместо OR),
+        продолжение - keyset по (created_at, id) после матча ``after_match_id``.
+        Матчи с архивированными партнерами отсеиваются до LIMIT, иначе они
+        занимают место на странице и обрывают список.
+        Возвращает анкеты и id матча, с которого продолжать (None - это конец).
+        """
+        keyset = ""
+        params: List[Any] = []
+        if after_match_id is not None:
+            keyset = "AND (created_at, id) < (SELECT created_at, id FROM matches WHERE id = ?)"
         
-        cs_users = self._execute_query("SELECT COUNT(*) as count FROM users WHERE game = 'cs'")
-        stats['cs_users'] = cs_users[0]['count'] if cs_users else 0
+        branch = '''
+            SELECT * FROM (
+                SELECT id, created_at, {other} AS other_id FROM matches
+                WHERE {side} = ? AND is_active = 1 {keyset}
+                AND EXISTS (SELECT 1 FROM users WHERE telegram_id = {other})
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            )
+        '''
+        query = f'''
+            SELECT u.*, m.id AS match_id FROM (
+                {branch.format(side="user1_id", other="user2_id", keyset=keyset)}
+                UNION ALL
+                {branch.format(side="user2_id", other="user1_id", keyset=keyset)}
+            ) m
+            JOIN users u ON u.telegram_id = m.other_id
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT ?
+        '''
         
-        # Активные пользователи (последние 7 дней)
-        week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        active_users = self._execute_query(
-            "SELECT COUNT(*) as count FROM users WHERE last_activity > ?", 
-            (week_ago,)
-        )
-        stats['active_users'] = active_users[0]['count'] if active_users else 0
+        # Запрашиваем на одну строку больше, чтобы понять, есть ли продолжение
+        for _ in range(2):
+            params.append(user_id)
+            if after_match_id is not None:
+                params.append(after_match_id)
+            params.append(limit + 1)
+        params.append(limit + 1)
         
-        # Матчи
-        total_matches = self._execute_query("SELECT COUNT(*) as count FROM matches WHERE is_active = 1")
-        stats['total_matches'] = total_matches[0]['count'] if total_matches else 0
+        result = self._execute_query(query, tuple(params))
         
-        # Лайки за сегодня
-        today = datetime.now().strftime('%Y-%m-%d')
-        today_likes = self._execute_query(
-            "SELECT COUNT(*) as count FROM likes WHERE DATE(created_at) = ?", 
-            (today,)
-        )
-        stats['today_likes'] = today_likes[0]['count'] if today_likes else 0
+        matches = []
+        for row in result[:limit]:
+            match = self._row_to_user(row)
+            match['match_id'] = match.pop('match_id')
+            matches.append(match)
         
-        return stats
+        next_match_id = matches[-1]['match_id'] if len(result) > limit else None
+        return matches, next_match_id
+    
+    def get_last_match(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Последний матч пользователя"""
+        matches, _ = self.get_matches_page(user_id, limit=1)
+        return matches[0] if matches else None
+    
+    def count_matches(self, user_id: int) -> int:
+        """Количество активных матчей пользователя (без архивированных партнеров)"""
+        result = self._execute_query('''
+            SELECT
+                (SELECT COUNT(*) FROM matches m WHERE m.user1_id = ? AND m.is_active = 1
+                 AND EXISTS (SELECT 1 FROM users WHERE telegram_id = m.user2_id)) +
+                (SELECT COUNT(*) FROM matches m WHERE m.user2_id = ? AND m.is_active = 1
+                 AND EXISTS (SELECT 1 FROM users WHERE telegram_id = m.user1_id)) AS count
+        ''', (user_id, user_id))
+        return result[0]['count'] if result else 0
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Получение статистики (счетчики + кэш)"""
+        return self.stats.get()
+    
+    def get_recent_users(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Получение последних зарегистрированных пользователей"""
+        result = self._execute_query(
+            "SELECT telegram_id, username, game, name, created_at FROM users ORDER BY created_at DESC LIMIT ?",
+            (limit,)
+        )
+        return [dict(row) for row in result]
+    
+    def count_inactive_users(self, since: str) -> int:
+        """Количество пользователей (включая архив) без активности с указанного момента"""
+        result = self._execute_query('''
+            SELECT
+                (SELECT COUNT(*) FROM users WHERE last_activity < ?) +
+                (SELECT COUNT(*) FROM users_archive WHERE last_activity < ?) AS count
+        ''', (since, since))
+        return result[0]['count'] if result else 0
     
     def update_last_activity(self, telegram_id: int):
         """Обновление времени последней активности"""
         self._execute_query(
             "UPDATE users SET last_activity = CURRENT_TIMESTAMP WHERE telegram_id = ?",
             (telegram_id,)
-        )
\ No newline at end of file
+        )
+    
+    def update_last_activity_batch(self, activity: List[Tuple[str, int]]) -> int:
+        """Пакетное обновление активности: список (last_activity, telegram_id)"""
+        if not activity:
+            return 0
+        
+        try:
+            with self._transaction() as conn:
+                # Не перезаписываем более свежее значение (например, из update_user_profile)
+                cursor = conn.executemany('''
+                    UPDATE users SET last_activity = ?1
+                    WHERE telegram_id = ?2
+                    AND (last_activity IS NULL OR last_activity < ?1)
+                ''', activity)
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка пакетного обновления активности: {e}")
+            return 0
+    
+    def get_fsm_session(self, key: str, not_before: int) -> Optional[Tuple[Optional[str], str]]:
+        """Состояние и данные FSM (JSON) по ключу, если сессия не просрочена"""
+        result = self._execute_query(
+            "SELECT state, data FROM fsm_sessions WHERE key = ? AND updated_at >= ?",
+            (key, not_before)
+        )
+        if result:
+            return result[0]['state'], result[0]['data']
+        return None
+    
+    def save_fsm_sessions(self, sessions: List[Tuple[str, bool, Optional[str], Optional[str], int]],
+                          not_before: int = 0) -> int:
+        """Пакетная запись сессий FSM.
+        
+        Элементы - (key, state_changed, state, data, updated_at): состояние
+        пишется только при ``state_changed``, данные - если не None.
+        Сохраненная сессия, не обновлявшаяся с ``not_before``, считается
+        пустой: незаписываемые поля сбрасываются, а не воскрешаются.
+        Сессии без состояния и данных удаляются.
+        """
+        if not sessions:
+            return 0
+        
+        try:
+            with self._transaction() as conn:
+                conn.executemany('''
+                    INSERT INTO fsm_sessions (key, state, data, updated_at)
+                    VALUES (?1, ?3, COALESCE(?4, '{}'), ?5)
+                    ON CONFLICT (key) DO UPDATE SET
+                        state = CASE
+                            WHEN ?2 THEN excluded.state
+                            WHEN updated_at < ?6 THEN NULL
+                            ELSE state
+                        END,
+                        data = CASE
+                            WHEN ?4 IS NOT NULL THEN excluded.data
+                            WHEN updated_at < ?6 THEN '{}'
+                            ELSE data
+                        END,
+                        updated_at = excluded.updated_at
+                ''', [session + (not_before,) for session in sessions])
+                conn.executemany(
+                    "DELETE FROM fsm_sessions WHERE key = ? AND state IS NULL AND data = '{}'",
+                    [(session[0],) for session in sessions]
+                )
+                return len(sessions)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка записи сессий FSM: {e}")
+            return 0
+    
+    def purge_fsm_sessions(self, before: int) -> int:
+        """Удаление сессий FSM, не обновлявшихся с ``before`` (unix time)"""
+        return self._execute_query(
+            "DELETE FROM fsm_sessions WHERE updated_at < ?",
+            (before,)
+        ) or 0
\ No newline at end of file
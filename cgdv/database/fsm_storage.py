@@ -0,0 +1,183 @@
+# database/fsm_storage.py
+"""
+Хранилище состояний FSM aiogram в базе SQLite
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config.settings import Settings
+from database.async_database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище в таблице fsm_sessions.
+    
+    Записи копятся в памяти и сбрасываются в базу одной транзакцией
+    через ``flush_interval`` секунд (или сразу при ``flush_interval <= 0``),
+    чтение сначала смотрит в еще не записанные изменения. Сессии, которые
+    не обновлялись дольше ``ttl`` секунд, считаются пустыми и удаляются.
+    """
+    
+    PURGE_INTERVAL = 600
+    
+    def __init__(self, db: AsyncDatabase, ttl: int = 86400,
+                 flush_interval: float = 1.0, flush_size: int = 200):
+        self.db = db
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_size = max(1, flush_size)
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        
+        # Незаписанные изменения: ключ -> {'state': ..., 'data': ...}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Изменения, которые прямо сейчас пишутся в базу
+        self._flushing: Dict[str, Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._last_purge = 0.0
+    
+    def _not_before(self) -> int:
+        """Граница свежести сессии (unix time)"""
+        return int(time.time()) - self.ttl
+    
+    async def _load(self, key: str) -> Dict[str, Any]:
+        """Сессия с учетом незаписанных изменений"""
+        pending = {**self._flushing.get(key, {}), **self._pending.get(key, {})}
+        if 'state' in pending and 'data' in pending:
+            return pending
+        
+        session = {'state': None, 'data': {}}
+        row = await self.db.get_fsm_session(key, self._not_before())
+        if row is not None:
+            session['state'], data = row
+            session['data'] = json.loads(data) if data else {}
+        
+        session.update(pending)
+        return session
+    
+    async def _write(self, key: str, field: str, value: Any):
+        """Записать изменение в буфер и запланировать сброс"""
+        self._pending.setdefault(key, {})[field] = value
+        
+        if self.flush_interval <= 0 or len(self._pending) >= self.flush_size:
+            await self.flush()
+        else:
+            self._schedule_flush(self.flush_interval)
+    
+    def _schedule_flush(self, delay: float):
+        """Запланировать отложенный сброс, если он еще не запланирован"""
+        task = self._flush_task
+        if task is None or task.done() or task is asyncio.current_task():
+            self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+    
+    async def _delayed_flush(self, delay: float):
+        """Сброс буфера после паузы, чтобы собрать изменения в одну пачку"""
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Ошибка сброса сессий FSM: {e}")
+    
+    def _requeue(self, batch: Dict[str, Dict[str, Any]]):
+        """Вернуть незаписанную пачку в буфер; более новые изменения важнее"""
+        for key, change in batch.items():
+            self._pending[key] = {**change, **self._pending.get(key, {})}
+    
+    async def flush(self, reschedule: bool = True):
+        """Записать накопленные изменения одной транзакцией.
+        
+        Неудачная пачка возвращается в буфер. Если в буфере что-то осталось
+        (пачка не записалась или изменения пришли во время записи), сброс
+        планируется снова, пока ``reschedule`` не выключен (остановка).
+        """
+        try:
+            await self._flush_batch()
+        finally:
+            if reschedule and self._pending:
+                # Не чаще раза в секунду, чтобы повтор ошибки не шел без паузы
+                self._schedule_flush(max(self.flush_interval, 1.0))
+    
+    async def _flush_batch(self):
+        """Запись буфера и периодическая очистка просроченных сессий"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+            if pending:
+                now = int(time.time())
+                sessions = []
+                for key, change in pending.items():
+                    data = change.get('data')
+                    sessions.append((
+                        key,
+                        'state' in change,
+                        change.get('state'),
+                        json.dumps(data, ensure_ascii=False, separators=(',', ':')) if data is not None else None,
+                        now
+                    ))
+                saved = 0
+                try:
+                    saved = await self.db.save_fsm_sessions(sessions, self._not_before())
+                finally:
+                    self._flushing = {}
+                    if not saved:
+                        logger.warning(f"⚠️ Сессии FSM не записаны, повтор: {len(pending)}")
+                        self._requeue(pending)
+            
+            if time.monotonic() - self._last_purge >= self.PURGE_INTERVAL:
+                self._last_purge = time.monotonic()
+                purged = await self.db.purge_fsm_sessions(self._not_before())
+                if purged:
+                    logger.info(f"🧹 Удалено просроченных сессий FSM: {purged}")
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Установить состояние"""
+        value = state.state if isinstance(state, State) else state
+        await self._write(self.key_builder.build(key), 'state', value)
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Текущее состояние"""
+        session = await self._load(self.key_builder.build(key))
+        return session['state']
+    
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """Заменить данные"""
+        await self._write(self.key_builder.build(key), 'data', copy.deepcopy(dict(data)))
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Данные сессии (копия)"""
+        session = await self._load(self.key_builder.build(key))
+        return copy.deepcopy(session['data'])
+    
+    async def close(self) -> None:
+        """Сбросить незаписанные изменения"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush(reschedule=False)
+        if self._pending:
+            logger.error(f"❌ Не записано сессий FSM при остановке: {len(self._pending)}")
+
+def create_fsm_storage(settings: Settings, db: AsyncDatabase) -> BaseStorage:
+    """Хранилище FSM по настройке FSM_STORAGE"""
+    if settings.FSM_STORAGE == "memory":
+        return MemoryStorage()
+    
+    if settings.FSM_STORAGE == "sqlite":
+        return SQLiteStorage(
+            db,
+            ttl=settings.FSM_TTL,
+            flush_interval=settings.FSM_FLUSH_INTERVAL,
+            flush_size=settings.FSM_FLUSH_SIZE
+        )
+    
+    raise ValueError(f"Неизвестное хранилище FSM: {settings.FSM_STORAGE}")
\ No newline at end of file
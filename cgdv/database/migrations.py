@@ -0,0 +1,244 @@
+# database/migrations.py
+"""
+Версионные миграции схемы базы данных
+
+Текущая версия схемы хранится в PRAGMA user_version. Каждая миграция
+применяется один раз; перенос данных выполняется пачками с коммитом после
+каждой пачки, чтобы не держать блокировку базы долго.
+"""
+
+import sqlite3
+import logging
+from typing import Callable, List
+
+from database import schema
+
+logger = logging.getLogger(__name__)
+
+class Migration:
+    """Одна миграция схемы"""
+    
+    def __init__(self, version: int, description: str,
+                 apply: Callable[[sqlite3.Connection, int], None], batched: bool = False):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        # Пакетные миграции сами коммитят каждую пачку и должны быть идемпотентны
+        self.batched = batched
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def _set_version(conn: sqlite3.Connection, version: int):
+    """Запись версии схемы"""
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+def _create_tables(conn: sqlite3.Connection, *names: str):
+    """Создание таблиц из каталога схемы"""
+    for name in names:
+        conn.execute(schema.TABLES[name])
+
+def _create_indexes(conn: sqlite3.Connection, *names: str):
+    """Создание индексов из каталога схемы"""
+    for name in names:
+        conn.execute(schema.INDEXES[name])
+
+def _drop_indexes(conn: sqlite3.Connection, *names: str):
+    """Удаление индексов"""
+    for name in names:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """Добавление столбца, если его еще нет (в свежей базе он уже есть в каталоге схемы)"""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _in_batches(conn: sqlite3.Connection, table: str, statement: str, batch_size: int) -> int:
+    """Выполнение запроса пачками по диапазонам id таблицы.
+    
+    ``statement`` получает параметры (id_from, id_to) и должен обрабатывать
+    строки с ``id > id_from AND id <= id_to``.
+    """
+    last_id = 0
+    total = 0
+    
+    while True:
+        row = conn.execute(
+            f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+            (last_id, batch_size)
+        ).fetchone()
+        upper_id = row[0]
+        if upper_id is None:
+            break
+        
+        cursor = conn.execute(statement, (last_id, upper_id))
+        conn.commit()
+        
+        total += max(cursor.rowcount, 0)
+        last_id = upper_id
+    
+    return total
+
+# --- Миграции ---
+
+def _initial_schema(conn: sqlite3.Connection, batch_size: int):
+    """Базовые таблицы"""
+    _create_tables(conn, "users", "likes", "matches")
+
+def _user_positions(conn: sqlite3.Connection, batch_size: int):
+    """Нормализованная таблица позиций с переносом из JSON"""
+    _create_tables(conn, "user_positions")
+    conn.commit()
+    
+    moved = _in_batches(conn, "users", '''
+        INSERT OR IGNORE INTO user_positions (telegram_id, position)
+        SELECT u.telegram_id, j.value
+        FROM users u, json_each(u.positions) j
+        WHERE u.id > ? AND u.id <= ?
+        AND u.positions IS NOT NULL AND json_valid(u.positions)
+    ''', batch_size)
+    logger.info(f"🔄 Позиции перенесены в user_positions: {moved}")
+
+def _matchmaking_indexes(conn: sqlite3.Connection, batch_size: int):
+    """Составные индексы под горячие запросы"""
+    _drop_indexes(
+        conn,
+        "idx_users_telegram_id", "idx_users_active", "idx_users_game_active",
+        "idx_likes_from_user", "idx_likes_to_user"
+    )
+    _create_indexes(
+        conn,
+        "idx_users_game", "idx_users_search", "idx_users_search_rating",
+        "idx_users_last_activity", "idx_users_created_at",
+        "idx_likes_to_user_created", "idx_likes_created_at",
+        "idx_matches_user1", "idx_matches_user2",
+        "idx_user_positions_position"
+    )
+
+def _stats_counters(conn: sqlite3.Connection, batch_size: int):
+    """Счетчики статистики на триггерах с начальным заполнением"""
+    _create_tables(conn, "stats_counters", "daily_likes")
+    
+    for name in schema.TRIGGERS:
+        conn.execute(schema.TRIGGERS[name])
+    
+    # Начальные значения - один раз полным подсчетом
+    conn.execute("DELETE FROM stats_counters")
+    conn.execute('''
+        INSERT INTO stats_counters (name, value)
+        SELECT 'total_users', COUNT(*) FROM users
+        UNION ALL
+        SELECT 'users_' || game, COUNT(*) FROM users GROUP BY game
+        UNION ALL
+        SELECT 'total_matches', COUNT(*) FROM matches WHERE is_active = 1
+    ''')
+    conn.execute("DELETE FROM daily_likes")
+    conn.execute('''
+        INSERT INTO daily_likes (day, count)
+        SELECT date(created_at), COUNT(*) FROM likes
+        WHERE created_at IS NOT NULL
+        GROUP BY date(created_at)
+    ''')
+
+def _fsm_sessions(conn: sqlite3.Connection, batch_size: int):
+    """Хранилище состояний FSM"""
+    _create_tables(conn, "fsm_sessions")
+    _create_indexes(conn, "idx_fsm_sessions_updated")
+
+def _like_inbox(conn: sqlite3.Connection, batch_size: int):
+    """Счетчики непросмотренных лайков"""
+    _create_tables(conn, "like_inbox")
+
+def _likes_reviewed(conn: sqlite3.Connection, batch_size: int):
+    """Отметка просмотренных входящих лайков"""
+    _add_column(conn, "likes", "reviewed_at", "TIMESTAMP")
+    _create_indexes(conn, "idx_likes_inbox")
+
+def _users_archive(conn: sqlite3.Connection, batch_size: int):
+    """Архив неактивных пользователей"""
+    _create_tables(conn, "users_archive")
+    _create_indexes(conn, "idx_users_archive_last_activity")
+    
+    for name in schema.ARCHIVE_TRIGGERS:
+        conn.execute(schema.ARCHIVE_TRIGGERS[name])
+    conn.execute("INSERT OR IGNORE INTO stats_counters (name, value) VALUES ('archived_users', 0)")
+
+def _profile_version(conn: sqlite3.Connection, batch_size: int):
+    """Версия анкеты для кэша отрендеренных карточек"""
+    _add_column(conn, "users", "profile_version", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "users_archive", "profile_version", "INTEGER NOT NULL DEFAULT 0")
+
+def _seed_like_inbox(conn: sqlite3.Connection, batch_size: int):
+    """Начальные счетчики непросмотренных лайков"""
+    # Уже поставленные лайки без ответа считаются непросмотренными
+    conn.execute('''
+        INSERT OR IGNORE INTO like_inbox (telegram_id, unread)
+        SELECT l.to_user_id, COUNT(*) FROM likes l
+        WHERE NOT EXISTS (
+            SELECT 1 FROM likes l2
+            WHERE l2.from_user_id = l.to_user_id AND l2.to_user_id = l.from_user_id
+        )
+        GROUP BY l.to_user_id
+    ''')
+
+def _review_matched_likes(conn: sqlite3.Connection, batch_size: int):
+    """Отметка просмотренными лайков, ставших матчами"""
+    # Лайки, ставшие матчами, во входящих больше не нужны
+    conn.execute('''
+        UPDATE likes SET reviewed_at = CURRENT_TIMESTAMP
+        WHERE reviewed_at IS NULL AND EXISTS (
+            SELECT 1 FROM likes l2
+            WHERE l2.from_user_id = likes.to_user_id AND l2.to_user_id = likes.from_user_id
+        )
+    ''')
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "базовые таблицы users, likes, matches", _initial_schema),
+    Migration(2, "таблица user_positions", _user_positions, batched=True),
+    Migration(3, "составные индексы для поиска, лайков и матчей", _matchmaking_indexes),
+    Migration(4, "счетчики статистики на триггерах", _stats_counters),
+    Migration(5, "таблица состояний FSM", _fsm_sessions),
+    Migration(6, "счетчики непросмотренных лайков", _like_inbox),
+    Migration(7, "отметка просмотренных лайков", _likes_reviewed),
+    Migration(8, "архив неактивных пользователей", _users_archive),
+    Migration(9, "версия анкеты", _profile_version),
+    Migration(10, "начальные счетчики непросмотренных лайков", _seed_like_inbox),
+    Migration(11, "взаимные лайки убраны из входящих", _review_matched_likes),
+]
+
+def latest_version() -> int:
+    """Версия схемы после применения всех миграций"""
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+def migrate(conn: sqlite3.Connection, batch_size: int = 1000) -> int:
+    """Применение всех недостающих миграций. Возвращает итоговую версию"""
+    current = get_version(conn)
+    
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        
+        logger.info(f"🔄 Миграция {migration.version}: {migration.description}")
+        
+        try:
+            if migration.batched:
+                migration.apply(conn, batch_size)
+                _set_version(conn, migration.version)
+                conn.commit()
+            else:
+                # DDL и версия - в одной транзакции
+                conn.execute("BEGIN")
+                migration.apply(conn, batch_size)
+                _set_version(conn, migration.version)
+                conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.error(f"❌ Ошибка миграции {migration.version}: {e}")
+            raise
+        
+        current = migration.version
+    
+    return current
\ No newline at end of file
@@ -0,0 +1,118 @@
+# database/pool.py
+"""
+Пул соединений SQLite для бота поиска сокомандников
+"""
+
+import sqlite3
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """Пул переиспользуемых соединений SQLite"""
+    
+    def __init__(self, db_path: str, pool_size: int = 5, journal_mode: str = "WAL",
+                 synchronous: str = "NORMAL", cache_size: int = -8000,
+                 mmap_size: int = 0, statement_cache_size: int = 128,
+                 busy_timeout: int = 5000):
+        self.db_path = db_path
+        self.pool_size = max(1, pool_size)
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.statement_cache_size = statement_cache_size
+        self.busy_timeout = busy_timeout
+        
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=self.pool_size)
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._trace_callback = None
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """Создание нового соединения с настройками производительности"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
+        conn.row_factory = sqlite3.Row
+        
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        
+        if self._trace_callback:
+            conn.set_trace_callback(self._trace_callback)
+        
+        return conn
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Получить соединение из пула (или создать новое, пока не достигнут лимит)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Пул соединений закрыт")
+        
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if len(self._all) < self.pool_size:
+                conn = self._create_connection()
+                self._all.append(conn)
+                logger.debug(f"🔌 Новое соединение с БД ({len(self._all)}/{self.pool_size})")
+                return conn
+        
+        # Все соединения заняты - ждем освобождения
+        return self._idle.get()
+    
+    def release(self, conn: sqlite3.Connection):
+        """Вернуть соединение в пул"""
+        if self._closed:
+            conn.close()
+            return
+        
+        # Незавершенная транзакция не должна попасть к следующему пользователю
+        if conn.in_transaction:
+            conn.rollback()
+        
+        self._idle.put_nowait(conn)
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Контекстный менеджер для работы с соединением из пула"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def set_trace_callback(self, callback):
+        """Трассировка SQL на всех текущих и будущих соединениях (для проверок и отладки)"""
+        with self._lock:
+            self._trace_callback = callback
+            for conn in self._all:
+                conn.set_trace_callback(callback)
+    
+    def close(self):
+        """Закрыть все соединения пула"""
+        with self._lock:
+            self._closed = True
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Ошибка закрытия соединения: {e}")
+            self._all.clear()
+        
+        logger.info("🔌 Пул соединений с БД закрыт")
\ No newline at end of file
@@ -0,0 +1,301 @@
+# database/schema.py
+"""
+Схема базы данных: таблицы, индексы под горячие запросы и проверка планов
+
+Определения здесь - каталог; применяются они миграциями из database/migrations.py
+"""
+
+import re
+import sqlite3
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+TABLES: Dict[str, str] = {
+    # Таблица пользователей
+    "users": '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            game TEXT NOT NULL,
+            name TEXT,
+            nickname TEXT,
+            age INTEGER,
+            rating TEXT,
+            positions TEXT,
+            additional_info TEXT,
+            photo_id TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_version INTEGER NOT NULL DEFAULT 0
+        )
+    ''',
+    # Архив неактивных пользователей: те же столбцы, что в users, и время переноса
+    "users_archive": '''
+        CREATE TABLE IF NOT EXISTS users_archive (
+            id INTEGER PRIMARY KEY,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            game TEXT NOT NULL,
+            name TEXT,
+            nickname TEXT,
+            age INTEGER,
+            rating TEXT,
+            positions TEXT,
+            additional_info TEXT,
+            photo_id TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP,
+            last_activity TIMESTAMP,
+            profile_version INTEGER NOT NULL DEFAULT 0,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Таблица лайков
+    "likes": '''
+        CREATE TABLE IF NOT EXISTS likes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_user_id INTEGER NOT NULL,
+            to_user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reviewed_at TIMESTAMP,
+            UNIQUE(from_user_id, to_user_id),
+            FOREIGN KEY (from_user_id) REFERENCES users (telegram_id),
+            FOREIGN KEY (to_user_id) REFERENCES users (telegram_id)
+        )
+    ''',
+    # Таблица матчей (взаимные лайки)
+    "matches": '''
+        CREATE TABLE IF NOT EXISTS matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user1_id INTEGER NOT NULL,
+            user2_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1,
+            UNIQUE(user1_id, user2_id),
+            FOREIGN KEY (user1_id) REFERENCES users (telegram_id),
+            FOREIGN KEY (user2_id) REFERENCES users (telegram_id)
+        )
+    ''',
+    # Таблица позиций (нормализованная копия users.positions для фильтрации)
+    "user_positions": '''
+        CREATE TABLE IF NOT EXISTS user_positions (
+            telegram_id INTEGER NOT NULL,
+            position TEXT NOT NULL,
+            PRIMARY KEY (telegram_id, position),
+            FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
+        ) WITHOUT ROWID
+    ''',
+    # Счетчики статистики, поддерживаемые триггерами
+    "stats_counters": '''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''',
+    # Количество лайков по дням (UTC)
+    "daily_likes": '''
+        CREATE TABLE IF NOT EXISTS daily_likes (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''',
+    # Непросмотренные входящие лайки и время последнего дайджеста (unix time)
+    "like_inbox": '''
+        CREATE TABLE IF NOT EXISTS like_inbox (
+            telegram_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0,
+            notified_at INTEGER
+        ) WITHOUT ROWID
+    ''',
+    # Состояния FSM aiogram (ключ хранилища -> состояние и данные в JSON)
+    "fsm_sessions": '''
+        CREATE TABLE IF NOT EXISTS fsm_sessions (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''',
+}
+
+# Столбцы users, которые переносятся в архив и обратно
+USER_COLUMNS = (
+    "id", "telegram_id", "username", "game", "name", "nickname", "age", "rating",
+    "positions", "additional_info", "photo_id", "is_active", "created_at", "last_activity",
+    "profile_version",
+)
+
+# Триггеры, поддерживающие stats_counters и daily_likes.
+# Счетчики: total_users, users_<game> (без архива), total_matches
+# (только активные матчи)
+TRIGGERS: Dict[str, str] = {
+    "trg_users_insert_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_insert_stats AFTER INSERT ON users
+        BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('total_users', 1), ('users_' || NEW.game, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''',
+    "trg_users_delete_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_delete_stats AFTER DELETE ON users
+        BEGIN
+            UPDATE stats_counters SET value = value - 1
+            WHERE name IN ('total_users', 'users_' || OLD.game);
+        END
+    ''',
+    "trg_users_game_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_game_stats AFTER UPDATE OF game ON users
+        WHEN OLD.game != NEW.game
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'users_' || OLD.game;
+            INSERT INTO stats_counters (name, value) VALUES ('users_' || NEW.game, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''',
+    "trg_matches_insert_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_matches_insert_stats AFTER INSERT ON matches
+        WHEN NEW.is_active = 1
+        BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('total_matches', 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''',
+    "trg_matches_delete_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_matches_delete_stats AFTER DELETE ON matches
+        WHEN OLD.is_active = 1
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'total_matches';
+        END
+    ''',
+    "trg_matches_active_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_matches_active_stats AFTER UPDATE OF is_active ON matches
+        WHEN OLD.is_active != NEW.is_active
+        BEGIN
+            UPDATE stats_counters
+            SET value = value + (CASE WHEN NEW.is_active = 1 THEN 1 ELSE -1 END)
+            WHERE name = 'total_matches';
+        END
+    ''',
+    "trg_likes_insert_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_likes_insert_stats AFTER INSERT ON likes
+        BEGIN
+            INSERT INTO daily_likes (day, count) VALUES (date(NEW.created_at), 1)
+            ON CONFLICT (day) DO UPDATE SET count = count + 1;
+        END
+    ''',
+    "trg_likes_delete_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_likes_delete_stats AFTER DELETE ON likes
+        BEGIN
+            UPDATE daily_likes SET count = count - 1 WHERE day = date(OLD.created_at);
+        END
+    ''',
+}
+
+# Триггеры счетчика archived_users; создаются вместе с таблицей users_archive
+ARCHIVE_TRIGGERS: Dict[str, str] = {
+    "trg_archive_insert_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_archive_insert_stats AFTER INSERT ON users_archive
+        BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('archived_users', 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''',
+    "trg_archive_delete_stats": '''
+        CREATE TRIGGER IF NOT EXISTS trg_archive_delete_stats AFTER DELETE ON users_archive
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'archived_users';
+        END
+    ''',
+}
+
+# Индексы под конкретные запросы Database.
+# UNIQUE(telegram_id) и UNIQUE(from_user_id, to_user_id) уже дают автоиндексы.
+INDEXES: Dict[str, str] = {
+    # Количество анкет по играм
+    "idx_users_game": "CREATE INDEX IF NOT EXISTS idx_users_game ON users(game)",
+    # fetch_search_page без фильтра рейтинга: (game, is_active) + keyset по rowid
+    "idx_users_search": (
+        "CREATE INDEX IF NOT EXISTS idx_users_search ON users(game, is_active) "
+        "WHERE name IS NOT NULL"
+    ),
+    # fetch_search_page с фильтром рейтинга
+    "idx_users_search_rating": (
+        "CREATE INDEX IF NOT EXISTS idx_users_search_rating ON users(game, is_active, rating) "
+        "WHERE name IS NOT NULL"
+    ),
+    # get_stats / count_inactive_users / архивация: фильтр по последней активности
+    "idx_users_last_activity": "CREATE INDEX IF NOT EXISTS idx_users_last_activity ON users(last_activity)",
+    # Очистка архива по последней активности
+    "idx_users_archive_last_activity": (
+        "CREATE INDEX IF NOT EXISTS idx_users_archive_last_activity ON users_archive(last_activity)"
+    ),
+    # get_recent_users: ORDER BY created_at DESC LIMIT
+    "idx_users_created_at": "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users(created_at)",
+    # get_users_who_liked_me: входящие лайки по времени, покрывающий
+    "idx_likes_to_user_created": (
+        "CREATE INDEX IF NOT EXISTS idx_likes_to_user_created "
+        "ON likes(to_user_id, created_at, from_user_id)"
+    ),
+    # Входящие лайки: keyset-проход по непросмотренным (created_at, id)
+    "idx_likes_inbox": (
+        "CREATE INDEX IF NOT EXISTS idx_likes_inbox ON likes(to_user_id, created_at, id) "
+        "WHERE reviewed_at IS NULL"
+    ),
+    # Лайки за день
+    "idx_likes_created_at": "CREATE INDEX IF NOT EXISTS idx_likes_created_at ON likes(created_at)",
+    # get_matches_page / count_matches / delete_user_profile: обе стороны матча
+    "idx_matches_user1": (
+        "CREATE INDEX IF NOT EXISTS idx_matches_user1 ON matches(user1_id, is_active, created_at)"
+    ),
+    "idx_matches_user2": (
+        "CREATE INDEX IF NOT EXISTS idx_matches_user2 ON matches(user2_id, is_active, created_at)"
+    ),
+    # Обратный поиск по позиции
+    "idx_user_positions_position": (
+        "CREATE INDEX IF NOT EXISTS idx_user_positions_position ON user_positions(position, telegram_id)"
+    ),
+    # Удаление просроченных сессий FSM
+    "idx_fsm_sessions_updated": (
+        "CREATE INDEX IF NOT EXISTS idx_fsm_sessions_updated ON fsm_sessions(updated_at)"
+    ),
+}
+
+# Запросы, для которых полный проход ожидаем:
+# обход индекса по порядку, который останавливается на LIMIT
+ALLOWED_SCANS: List[str] = [
+    r"^SELECT .* FROM users ORDER BY created_at DESC LIMIT \d+$",
+]
+
+def explain_query_plan(conn: sqlite3.Connection, query: str, params: tuple = ()) -> List[str]:
+    """Строки EXPLAIN QUERY PLAN для запроса"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    return [row[3] for row in rows]
+
+def find_full_scans(plan: List[str]) -> List[str]:
+    """Шаги плана, которые проходят таблицу или индекс целиком.
+    
+    Проход по результату подзапроса (уже ограниченному своим LIMIT) полным
+    проходом таблицы не считается.
+    """
+    subqueries = {
+        step.split(" ", 1)[1] for step in plan
+        if step.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    }
+    scans = []
+    for step in plan:
+        if not step.startswith("SCAN ") or step == "SCAN CONSTANT ROW":
+            continue
+        target = step[len("SCAN "):]
+        if target.startswith("(subquery-") or target in subqueries:
+            continue
+        scans.append(step)
+    return scans
+
+def is_scan_allowed(query: str) -> bool:
+    """Разрешен ли полный проход для запроса"""
+    normalized = " ".join(query.split())
+    return any(re.match(pattern, normalized) for pattern in ALLOWED_SCANS)
\ No newline at end of file
@@ -0,0 +1,69 @@
+# database/search_session.py
+"""
+Курсор просмотра анкет в поиске
+"""
+
+import zlib
+from typing import Any, Dict, List, Optional
+
+def filters_hash(game: str, rating_filter: Optional[str], position_filter: Optional[str]) -> int:
+    """Стабильный хэш набора фильтров поиска"""
+    key = f"{game}|{rating_filter or ''}|{position_filter or ''}"
+    return zlib.crc32(key.encode('utf-8'))
+
+class SearchCursor:
+    """Компактная позиция просмотра анкет, которая хранится в FSM.
+    
+    Анкеты обходятся по кольцу id: от случайной точки ``start_id`` до конца
+    таблицы, затем с начала до ``start_id``. В состоянии лежат только
+    позиция обхода и короткая очередь id следующих анкет - сами анкеты
+    читаются из кэша по мере показа.
+    """
+    
+    def __init__(self, filters: int, start_id: Optional[int] = None, last_id: Optional[int] = None,
+                 wrapped: bool = False, exhausted: bool = False, queue: Optional[List[int]] = None):
+        self.filters = filters
+        self.start_id = start_id
+        self.last_id = last_id
+        self.wrapped = wrapped
+        self.exhausted = exhausted
+        self.queue = list(queue or [])
+    
+    @classmethod
+    def from_state(cls, data: Optional[Dict[str, Any]]) -> Optional["SearchCursor"]:
+        """Курсор из данных FSM (None, если его нет)"""
+        if not data:
+            return None
+        return cls(
+            filters=data['f'],
+            start_id=data.get('s'),
+            last_id=data.get('l'),
+            wrapped=bool(data.get('w')),
+            exhausted=bool(data.get('x')),
+            queue=data.get('q')
+        )
+    
+    def to_state(self) -> Dict[str, Any]:
+        """Сериализация для FSM"""
+        return {
+            'f': self.filters,
+            's': self.start_id,
+            'l': self.last_id,
+            'w': int(self.wrapped),
+            'x': int(self.exhausted),
+            'q': self.queue,
+        }
+    
+    @property
+    def current(self) -> Optional[int]:
+        """telegram_id анкеты, которую нужно показать"""
+        return self.queue[0] if self.queue else None
+    
+    def advance(self):
+        """Перейти к следующей анкете"""
+        if self.queue:
+            self.queue.pop(0)
+    
+    def needs_refill(self, threshold: int) -> bool:
+        """Пора ли подгрузить следующую страницу"""
+        return not self.exhausted and len(self.queue) <= threshold
\ No newline at end of file
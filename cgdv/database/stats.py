@@ -0,0 +1,78 @@
+# database/stats.py
+"""
+Статистика бота на счетчиках с кэшированием
+"""
+
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+class StatsService:
+    """Статистика из счетчиков, которые поддерживают триггеры в БД.
+    
+    Ни один запрос не зависит от размера таблицы лайков; результат
+    кэшируется на ``ttl`` секунд.
+    """
+    
+    COUNTERS = ('total_users', 'users_dota', 'users_cs', 'archived_users', 'total_matches')
+    
+    def __init__(self, execute: Callable[[str, tuple], List[sqlite3.Row]], ttl: int = 60):
+        self._execute = execute
+        self.ttl = ttl
+        self._cached: Optional[Dict[str, int]] = None
+        self._cached_at = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self) -> Dict[str, int]:
+        """Статистика (из кэша, если он еще свежий)"""
+        with self._lock:
+            if self._cached is not None and time.monotonic() - self._cached_at < self.ttl:
+                return dict(self._cached)
+        
+        stats = self._load()
+        
+        with self._lock:
+            self._cached = stats
+            self._cached_at = time.monotonic()
+        
+        return dict(stats)
+    
+    def invalidate(self):
+        """Сбросить кэш"""
+        with self._lock:
+            self._cached = None
+    
+    def _load(self) -> Dict[str, int]:
+        """Чтение счетчиков из базы"""
+        placeholders = ", ".join("?" for _ in self.COUNTERS)
+        rows = self._execute(
+            f"SELECT name, value FROM stats_counters WHERE name IN ({placeholders})",
+            self.COUNTERS
+        )
+        counters = {row['name']: row['value'] for row in rows}
+        
+        now = datetime.now(timezone.utc)
+        today = now.strftime('%Y-%m-%d')
+        today_likes = self._execute(
+            "SELECT count FROM daily_likes WHERE day = ?",
+            (today,)
+        )
+        
+        # Активные за неделю - диапазон по индексу last_activity
+        week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+        active_users = self._execute(
+            "SELECT COUNT(*) as count FROM users WHERE last_activity > ?",
+            (week_ago,)
+        )
+        
+        return {
+            'total_users': counters.get('total_users', 0),
+            'dota_users': counters.get('users_dota', 0),
+            'cs_users': counters.get('users_cs', 0),
+            'archived_users': counters.get('archived_users', 0),
+            'active_users': active_users[0]['count'] if active_users else 0,
+            'total_matches': counters.get('total_matches', 0),
+            'today_likes': today_likes[0]['count'] if today_likes else 0,
+        }
\ No newline at end of file
@@ -4,21 +4,24 @@
 """
 
 import logging
-from aiogram import Router, F, Bot
+from typing import Any, Dict, Optional
+from aiogram import Router, F
 from aiogram.types import CallbackQuery
 
-from database.database import Database
-from keyboards.keyboards import Keyboards
+from database.database import LikeResult
+from utils.notifications import notifications
+from utils.context import app_context
 from utils.texts import (
-    format_profile_text, MATCH_CREATED, NEW_LIKE_NOTIFICATION
+    format_profile_text, MATCH_CREATED
 )
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-# Инициализация компонентов
-db = Database()
-kb = Keyboards()
+# Общие компоненты
+db = app_context.db
+kb = app_context.kb
+settings = app_context.settings
 
 @router.callback_query(F.data == "my_likes")
 async def show_my_likes(callback: CallbackQuery):
@@ -26,15 +29,18 @@ async def show_my_likes(callback: CallbackQuery):
     user_id = callback.from_user.id
     
     # Проверяем что у пользователя есть анкета
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     if not user or not user['name']:
         await callback.answer("❌ Сначала создайте анкету", show_alert=True)
         return
     
-    # Получаем пользователей, которые лайкнули меня
-    liked_by = db.get_users_who_liked_me(user_id)
+    # Самый свежий непросмотренный лайк
+    first = await db.get_like_inbox_next(user_id)
     
-    if not liked_by:
+    # Входящие открыты - новые лайки больше не нужно включать в дайджест
+    await db.mark_likes_seen(user_id)
+    
+    if first is None:
         text = (
             "❤️ Пока никто не лайкнул вашу анкету\n\n"
             "Попробуйте:\n"
@@ -51,11 +57,11 @@ async def show_my_likes(callback: CallbackQuery):
         return
     
     # Показываем первого пользователя
-    await show_like_profile(callback, liked_by, 0)
+    await show_like_profile(callback, first[0])
 
-async def show_like_profile(callback: CallbackQuery, profiles: list, index: int):
+async def show_like_profile(callback: CallbackQuery, profile: Optional[Dict[str, Any]]):
     """Показать профиль пользователя, который лайкнул"""
-    if index >= len(profiles):
+    if profile is None:
         # Все лайки просмотрены
         text = (
             "✅ Все лайки просмотрены!\n\n"
@@ -74,7 +80,6 @@ async def show_like_profile(callback: CallbackQuery, profiles: list, index: int)
         await callback.answer()
         return
     
-    profile = profiles[index]
     profile_text = format_profile_text(profile)
     
     # Добавляем информацию о том, что это лайк
@@ -108,7 +113,7 @@ async def show_like_profile(callback: CallbackQuery, profiles: list, index: int)
         await callback.answer("❌ Ошибка загрузки анкеты")
 
 @router.callback_query(F.data.startswith("like_back_"))
-async def like_back(callback: CallbackQuery, bot: Bot):
+async def like_back(callback: CallbackQuery):
     """Лайкнуть в ответ"""
     try:
         target_user_id = int(callback.data.split("_")[2])
@@ -119,22 +124,20 @@ async def like_back(callback: CallbackQuery, bot: Bot):
     
     from_user_id = callback.from_user.id
     
-    # Проверяем не ставили ли мы уже лайк
-    existing_like = db._execute_query(
-        "SELECT id FROM likes WHERE from_user_id = ? AND to_user_id = ?",
-        (from_user_id, target_user_id)
-    )
+    # Добавляем лайк (это точно будет матч, так как другой пользователь уже лайкнул)
+    result = await db.add_like(from_user_id, target_user_id)
     
-    if existing_like:
+    if result == LikeResult.DUPLICATE:
         await callback.answer("❌ Вы уже лайкнули этого игрока", show_alert=True)
         return
     
-    # Добавляем лайк (это точно будет матч, так как другой пользователь уже лайкнул)
-    is_match = db.add_like(from_user_id, target_user_id)
+    if result == LikeResult.ERROR:
+        await callback.answer("❌ Ошибка обработки лайка")
+        return
     
-    if is_match:
+    if result == LikeResult.MATCHED:
         # Получаем данные пользователя для показа контакта
-        match_user = db.get_user(target_user_id)
+        match_user = await db.get_user(target_user_id)
         
         if match_user:
             profile_text = format_profile_text(match_user, show_contact=True)
@@ -150,8 +153,8 @@ async def like_back(callback: CallbackQuery, bot: Bot):
             logger.error(f"Ошибка показа матча: {e}")
             await callback.message.answer(text, reply_markup=keyboard)
         
-        # Уведомляем другого пользователя
-        await notify_about_match(bot, target_user_id, from_user_id)
+        # Уведомление другому пользователю уходит в фоне
+        notifications.notify_match(target_user_id, from_user_id)
         
         logger.info(f"💖 Взаимный лайк: {from_user_id} <-> {target_user_id}")
     else:
@@ -171,30 +174,21 @@ async def like_back(callback: CallbackQuery, bot: Bot):
 @router.callback_query(F.data.startswith("skip_like_"))
 async def skip_like(callback: CallbackQuery):
     """Пропустить лайк"""
-    # Получаем следующие лайки
+    try:
+        target_user_id = int(callback.data.split("_")[2])
+    except (ValueError, IndexError):
+        logger.error(f"Ошибка парсинга callback_data для skip_like: {callback.data}")
+        await callback.answer("❌ Ошибка обработки")
+        return
+    
     user_id = callback.from_user.id
-    liked_by = db.get_users_who_liked_me(user_id)
     
-    if len(liked_by) <= 1:
-        # Это был последний лайк
-        text = (
-            "✅ Все лайки просмотрены!\n\n"
-            "Зайдите позже, возможно появятся новые."
-        )
-        
-        try:
-            await safe_edit_message(
-                callback.message,
-                text,
-                kb.back_to_main()
-            )
-        except Exception as e:
-            logger.error(f"Ошибка показа окончания лайков: {e}")
-    else:
-        # Показываем следующий лайк (удаляем текущий из списка)
-        await show_like_profile(callback, liked_by[1:], 0)
+    # Отмечаем лайк просмотренным и берем следующий, более старый
+    position = await db.mark_like_reviewed(user_id, target_user_id)
+    following = await db.get_like_inbox_next(user_id, position)
     
-    await callback.answer()
+    # Если это был последний лайк, show_like_profile покажет итог
+    await show_like_profile(callback, following[0] if following else None)
 
 async def safe_edit_message(message, text: str, keyboard=None):
     """Безопасное редактирование сообщения"""
@@ -211,35 +205,35 @@ async def safe_edit_message(message, text: str, keyboard=None):
         # Fallback - отправляем новое сообщение
         await message.answer(text, reply_markup=keyboard)
 
-async def notify_about_match(bot: Bot, user_id: int, match_user_id: int):
-    """Уведомить пользователя о матче"""
-    try:
-        match_user = db.get_user(match_user_id)
-        
-        if match_user:
-            text = f"🎉 У вас новый матч!\n\n{match_user['name']} лайкнул вас в ответ!"
-        else:
-            text = "🎉 У вас новый матч!"
-        
-        await bot.send_message(
-            chat_id=user_id,
-            text=text,
-            reply_markup=kb.back_to_main()
-        )
-        logger.info(f"📨 Уведомление о матче отправлено {user_id}")
-    except Exception as e:
-        logger.error(f"Ошибка отправки уведомления о матче: {e}")
-
 # Дополнительные функции для работы с матчами
 
 @router.callback_query(F.data == "view_matches")
 async def view_matches(callback: CallbackQuery):
     """Посмотреть все матчи"""
+    await show_matches_page(callback)
+
+@router.callback_query(F.data.startswith("matches_after_"))
+async def view_more_matches(callback: CallbackQuery):
+    """Следующая страница матчей"""
+    try:
+        _, _, after_match_id, shown = callback.data.split("_")
+        after_match_id, shown = int(after_match_id), int(shown)
+    except ValueError:
+        logger.error(f"Ошибка парсинга callback_data для матчей: {callback.data}")
+        await callback.answer("❌ Ошибка обработки")
+        return
+    
+    await show_matches_page(callback, after_match_id, shown)
+
+async def show_matches_page(callback: CallbackQuery, after_match_id: int = None, shown: int = 0):
+    """Показать страницу матчей, начиная после матча ``after_match_id``"""
     user_id = callback.from_user.id
     
-    matches = db.get_matches(user_id)
+    matches, next_match_id = await db.get_matches_page(
+        user_id, settings.MATCHES_PAGE_SIZE, after_match_id
+    )
     
-    if not matches:
+    if not matches and after_match_id is None:
         text = (
             "💔 У вас пока нет матчей\n\n"
             "Чтобы получить матчи:\n"
@@ -255,17 +249,19 @@ async def view_matches(callback: CallbackQuery):
         return
     
     # Формируем список матчей
-    text = f"💖 Ваши матчи ({len(matches)}):\n\n"
+    total = await db.count_matches(user_id)
+    text = f"💖 Ваши матчи ({total}):\n\n"
     
-    for i, match in enumerate(matches, 1):
+    for i, match in enumerate(matches, shown + 1):
         name = match['name']
-        username = match.get('username', 'нет username')
+        username = match.get('username') or 'нет username'
         text += f"{i}. {name} (@{username})\n"
     
     text += "\n💬 Вы можете связаться с любым из них!"
     
-    await callback.message.edit_text(
+    await safe_edit_message(
+        callback.message,
         text,
-        reply_markup=kb.back_to_main()
+        kb.matches_page(next_match_id, shown + len(matches))
     )
     await callback.answer()
\ No newline at end of file
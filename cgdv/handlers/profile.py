@@ -4,19 +4,20 @@
 """
 
 import logging
+from typing import Dict, Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from database.database import Database
-from keyboards.keyboards import Keyboards
 from utils.texts import (
     CREATE_PROFILE_MESSAGE, PROFILE_CREATED, PROFILE_UPDATED,
     PROFILE_DELETED, QUESTIONS, format_profile_text
 )
 from utils.validators import Validators
-from config.settings import Settings
+from utils.cards import get_card_renderer
+from utils.context import app_context
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -31,17 +32,28 @@ class ProfileStates(StatesGroup):
     waiting_for_additional_info = State()
     waiting_for_photo = State()
 
-# Инициализация компонентов
-db = Database()
-kb = Keyboards()
-validators = Validators()
-settings = Settings()
+# Шаг анкеты для каждого поля, в порядке вопросов
+FIELD_STEPS = {
+    'name': ProfileStates.waiting_for_name,
+    'nickname': ProfileStates.waiting_for_nickname,
+    'age': ProfileStates.waiting_for_age,
+    'rating': ProfileStates.waiting_for_rating,
+    'positions': ProfileStates.waiting_for_positions,
+    'additional_info': ProfileStates.waiting_for_additional_info,
+    'photo_id': ProfileStates.waiting_for_photo,
+}
+
+# Общие компоненты
+db = app_context.db
+kb = app_context.kb
+settings = app_context.settings
+validators = Validators(settings)
 
 @router.callback_query(F.data.in_(["create_profile", "edit_profile"]))
 async def start_profile_creation(callback: CallbackQuery, state: FSMContext):
     """Начать создание/редактирование профиля"""
     user_id = callback.from_user.id
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     
     if not user:
         await callback.answer("❌ Ошибка: пользователь не найден", show_alert=True)
@@ -286,22 +298,61 @@ async def wrong_photo_format(message: Message):
         reply_markup=kb.skip_photo()
     )
 
+async def store_profile(user_id: int, data: dict, photo_id: str) -> Tuple[bool, Dict[str, str]]:
+    """Проверка собранной анкеты и запись в базу данных.
+    
+    Возвращает успех записи и ошибки проверки по полям.
+    """
+    profile, errors = validators.validate_profile({
+        **data, 'game': data.get('user_game'), 'photo_id': photo_id
+    })
+    if errors:
+        logger.warning(f"⚠️ Анкета {user_id} не прошла проверку: {errors}")
+        return False, errors
+    
+    success = await db.update_user_profile(telegram_id=user_id, **profile)
+    get_card_renderer().invalidate(user_id)
+    return success, {}
+
+async def return_to_invalid_field(state: FSMContext, data: dict,
+                                  errors: Dict[str, str]) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Вернуть анкету к первому неверному полю, не теряя остальные ответы.
+    
+    Возвращает текст с ошибками и вопросом этого шага и клавиатуру шага.
+    """
+    text = "\n".join(errors.values()) + "\n\n"
+    game = data.get('user_game')
+    
+    for field, step in FIELD_STEPS.items():
+        if field not in errors:
+            continue
+        
+        await state.set_state(step)
+        if field == 'rating':
+            return text + "🏆 Выберите ваш рейтинг:", kb.rating_options(game)
+        if field == 'positions':
+            await state.update_data(positions_selected=[])
+            return text + "⚔️ Выберите ваши позиции/роли:", kb.position_options(game, multiselect=True, selected=[])
+        if field == 'photo_id':
+            return text + QUESTIONS["photo"], kb.skip_photo()
+        return text + QUESTIONS[field], None
+    
+    # Ошибка не в полях анкеты (например, неизвестная игра) - шаг не меняется
+    return text + "Попробуйте заполнить анкету заново.", kb.back_to_main()
+
 async def save_profile(message: Message, state: FSMContext, photo_id: str):
     """Сохранение профиля"""
     data = await state.get_data()
     user_id = message.from_user.id
     
     # Сохраняем в базу данных
-    success = db.update_user_profile(
-        telegram_id=user_id,
-        name=data['name'],
-        nickname=data['nickname'],
-        age=data['age'],
-        rating=data['rating'],
-        positions=data['positions'],
-        additional_info=data['additional_info'],
-        photo_id=photo_id
-    )
+    success, errors = await store_profile(user_id, data, photo_id)
+    
+    if errors:
+        # Состояние сохраняется: пользователь исправляет только неверное поле
+        text, markup = await return_to_invalid_field(state, data, errors)
+        await message.answer(text, reply_markup=markup)
+        return
     
     await state.clear()
     
@@ -327,16 +378,14 @@ async def save_profile_callback(callback: CallbackQuery, state: FSMContext, phot
     user_id = callback.from_user.id
     
     # Сохраняем в базу данных
-    success = db.update_user_profile(
-        telegram_id=user_id,
-        name=data['name'],
-        nickname=data['nickname'],
-        age=data['age'],
-        rating=data['rating'],
-        positions=data['positions'],
-        additional_info=data['additional_info'],
-        photo_id=photo_id
-    )
+    success, errors = await store_profile(user_id, data, photo_id)
+    
+    if errors:
+        # Состояние сохраняется: пользователь исправляет только неверное поле
+        text, markup = await return_to_invalid_field(state, data, errors)
+        await callback.message.edit_text(text, reply_markup=markup)
+        await callback.answer()
+        return
     
     await state.clear()
     
@@ -378,7 +427,8 @@ async def delete_profile(callback: CallbackQuery):
     """Удаление профиля"""
     user_id = callback.from_user.id
     
-    success = db.delete_user_profile(user_id)
+    success = await db.delete_user_profile(user_id)
+    get_card_renderer().invalidate(user_id)
     
     if success:
         await callback.message.edit_text(
@@ -4,19 +4,21 @@
 """
 
 import logging
-from aiogram import Router, F, Bot
+from typing import Optional
+from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from database.database import Database
-from keyboards.keyboards import Keyboards
+from database.database import LikeResult
+from database.search_session import SearchCursor, filters_hash
 from utils.texts import (
     format_search_filters, format_profile_text, 
-    NO_MORE_PROFILES, LIKE_SENT, MATCH_CREATED,
-    NEW_LIKE_NOTIFICATION
+    NO_MORE_PROFILES, LIKE_SENT, MATCH_CREATED
 )
-from config.settings import Settings
+from utils.notifications import notifications
+from utils.prefetch import SearchPrefetcher
+from utils.context import app_context
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -26,16 +28,24 @@ class SearchStates(StatesGroup):
     setting_filters = State()
     browsing_profiles = State()
 
-# Инициализация компонентов
-db = Database()
-kb = Keyboards()
-settings = Settings()
+# Общие компоненты
+db = app_context.db
+kb = app_context.kb
+settings = app_context.settings
+prefetcher = SearchPrefetcher(
+    db, kb,
+    depth=settings.SEARCH_PREFETCH_DEPTH,
+    page_size=settings.SEARCH_PAGE_SIZE,
+    threshold=settings.SEARCH_PREFETCH_THRESHOLD,
+    ttl=settings.PROFILE_CACHE_TTL,
+    max_users=settings.SEARCH_PREFETCH_USERS
+)
 
 @router.callback_query(F.data == "search_teammates")
 async def start_search(callback: CallbackQuery, state: FSMContext):
     """Начать поиск сокомандников"""
     user_id = callback.from_user.id
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     
     if not user or not user['name']:
         await callback.answer("❌ Сначала создайте анкету", show_alert=True)
@@ -47,8 +57,7 @@ async def start_search(callback: CallbackQuery, state: FSMContext):
         user_game=user['game'],
         rating_filter=None,
         position_filter=None,
-        current_profiles=[],
-        current_index=0
+        search_cursor=None
     )
     
     # Показываем экран фильтров
@@ -138,15 +147,10 @@ async def begin_browsing(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     data = await state.get_data()
     
-    # Получаем анкеты с учетом фильтров
-    profiles = db.get_potential_matches(
-        user_id=user_id,
-        rating_filter=data.get('rating_filter'),
-        position_filter=data.get('position_filter'),
-        limit=20
-    )
+    # Первая страница анкет с учетом фильтров; в состоянии остается только курсор
+    cursor = await new_search_cursor(user_id, data)
     
-    if not profiles:
+    if cursor.current is None:
         try:
             await safe_edit_message(
                 callback.message,
@@ -161,26 +165,40 @@ async def begin_browsing(callback: CallbackQuery, state: FSMContext):
     
     # Переходим в режим просмотра
     await state.set_state(SearchStates.browsing_profiles)
-    await state.update_data(
-        current_profiles=profiles,
-        current_index=0
-    )
+    await state.update_data(search_cursor=cursor.to_state())
     
-    # Показываем первую анкету
-    await show_current_profile(callback, state)
+    # Показываем первую анкету и готовим следующие в фоне
+    await show_current_profile(callback, state, cursor)
+    prefetcher.schedule(
+        user_id, cursor, data.get('rating_filter'), data.get('position_filter')
+    )
 
 @router.callback_query(F.data == "continue_search", SearchStates.browsing_profiles)
 async def continue_search(callback: CallbackQuery, state: FSMContext):
     """Продолжить поиск (показать следующую анкету)"""
     await show_next_profile(callback, state)
 
-async def show_current_profile(callback: CallbackQuery, state: FSMContext):
+async def new_search_cursor(user_id: int, data: dict) -> SearchCursor:
+    """Новый курсор просмотра с загруженной первой страницей"""
+    rating_filter = data.get('rating_filter')
+    position_filter = data.get('position_filter')
+    
+    cursor = SearchCursor(filters_hash(data['user_game'], rating_filter, position_filter))
+    await db.fetch_search_page(
+        user_id, cursor, rating_filter, position_filter, settings.SEARCH_PAGE_SIZE
+    )
+    return cursor
+
+async def show_current_profile(callback: CallbackQuery, state: FSMContext,
+                               cursor: Optional[SearchCursor] = None):
     """Показать текущую анкету"""
-    data = await state.get_data()
-    profiles = data['current_profiles']
-    index = data['current_index']
+    if cursor is None:
+        data = await state.get_data()
+        cursor = SearchCursor.from_state(data.get('search_cursor'))
+    
+    profile_id = cursor.current if cursor else None
     
-    if index >= len(profiles):
+    if profile_id is None:
         # Анкеты закончились
         await callback.message.edit_text(
             NO_MORE_PROFILES,
@@ -189,50 +207,84 @@ async def show_current_profile(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
         return
     
-    profile = profiles[index]
-    profile_text = format_profile_text(profile)
+    # Карточка обычно уже отрендерена в фоне, иначе анкета берется из кэша
+    card = prefetcher.take_card(callback.from_user.id, profile_id)
+    if card is None:
+        profile = await db.get_user(profile_id)
+        
+        if not profile or not profile['name']:
+            # Анкету удалили, пока она ждала в очереди
+            await show_next_profile(callback, state, cursor)
+            return
+        
+        card = prefetcher.render(profile)
     
     # Показываем анкету
     try:
-        if profile.get('photo_id'):
+        if card.photo_id:
             # С фото
             await callback.message.delete()
             await callback.message.answer_photo(
-                photo=profile['photo_id'],
-                caption=profile_text,
-                reply_markup=kb.search_actions(profile['telegram_id'])
+                photo=card.photo_id,
+                caption=card.text,
+                reply_markup=card.keyboard
             )
         else:
             # Без фото
             await callback.message.edit_text(
-                profile_text,
-                reply_markup=kb.search_actions(profile['telegram_id'])
+                card.text,
+                reply_markup=card.keyboard
             )
         
         await callback.answer()
         
     except Exception as e:
         logger.error(f"Ошибка показа анкеты: {e}")
-        await show_next_profile(callback, state)
+        await show_next_profile(callback, state, cursor)
 
-async def show_next_profile(callback: CallbackQuery, state: FSMContext):
+async def show_next_profile(callback: CallbackQuery, state: FSMContext,
+                            cursor: Optional[SearchCursor] = None):
     """Показать следующую анкету"""
     data = await state.get_data()
-    current_index = data['current_index']
+    if cursor is None:
+        cursor = SearchCursor.from_state(data.get('search_cursor'))
+    
+    if cursor is not None:
+        rating_filter = data.get('rating_filter')
+        position_filter = data.get('position_filter')
+        
+        if cursor.filters != filters_hash(data.get('user_game'), rating_filter, position_filter):
+            # Фильтры поменялись - начинаем обход заново
+            cursor = await new_search_cursor(callback.from_user.id, data)
+        else:
+            cursor.advance()
+            
+            # Следующая страница обычно уже загружена в фоне
+            if cursor.needs_refill(settings.SEARCH_PREFETCH_THRESHOLD):
+                if not await prefetcher.apply_page(callback.from_user.id, cursor):
+                    await db.fetch_search_page(
+                        callback.from_user.id, cursor, rating_filter, position_filter,
+                        settings.SEARCH_PAGE_SIZE
+                    )
+        
+        await state.update_data(search_cursor=cursor.to_state())
     
-    # Увеличиваем индекс
-    await state.update_data(current_index=current_index + 1)
+    # Показываем следующую анкету и готовим следующие за ней
+    await show_current_profile(callback, state, cursor)
     
-    # Показываем следующую анкету
-    await show_current_profile(callback, state)
+    if cursor is not None and cursor.current is not None:
+        prefetcher.schedule(
+            callback.from_user.id, cursor,
+            data.get('rating_filter'), data.get('position_filter')
+        )
 
-@router.callback_query(F.data.startswith("skip_"))
+@router.callback_query(F.data.startswith("skip_") & ~F.data.startswith("skip_like_"))
 async def skip_profile(callback: CallbackQuery, state: FSMContext):
     """Пропустить анкету"""
     await show_next_profile(callback, state)
 
 @router.callback_query(F.data.startswith("like_") & ~F.data.startswith("like_back_"))
-async def like_profile(callback: CallbackQuery, state: FSMContext, bot: Bot):
+async def like_profile(callback: CallbackQuery, state: FSMContext):
     """Лайкнуть анкету"""
     try:
         target_user_id = int(callback.data.split("_")[1])
@@ -249,17 +301,25 @@ async def like_profile(callback: CallbackQuery, state: FSMContext, bot: Bot):
         return
     
     # Добавляем лайк
-    is_match = db.add_like(from_user_id, target_user_id)
+    result = await db.add_like(from_user_id, target_user_id)
+    
+    if result == LikeResult.DUPLICATE:
+        await callback.answer("❌ Вы уже лайкнули этого игрока", show_alert=True)
+        return
     
-    if is_match:
+    if result == LikeResult.ERROR:
+        await callback.answer("❌ Ошибка обработки лайка")
+        return
+    
+    if result == LikeResult.MATCHED:
         # Взаимный лайк - матч!
         await callback.message.edit_text(
             MATCH_CREATED,
             reply_markup=kb.after_match()
         )
         
-        # Уведомляем другого пользователя
-        await notify_about_match(bot, target_user_id, from_user_id)
+        # Уведомление другому пользователю уходит в фоне
+        notifications.notify_match(target_user_id, from_user_id)
         
         logger.info(f"💖 Матч создан: {from_user_id} <-> {target_user_id}")
     else:
@@ -269,8 +329,8 @@ async def like_profile(callback: CallbackQuery, state: FSMContext, bot: Bot):
             reply_markup=kb.after_like()
         )
         
-        # Уведомляем о лайке
-        await notify_about_like(bot, target_user_id)
+        # Уведомление о лайке уходит в фоне
+        notifications.notify_like(target_user_id)
         
         logger.info(f"👍 Лайк: {from_user_id} -> {target_user_id}")
     
@@ -281,15 +341,13 @@ async def view_last_match(callback: CallbackQuery):
     """Посмотреть контакт последнего матча"""
     user_id = callback.from_user.id
     
-    # Получаем последний матч
-    matches = db.get_matches(user_id)
+    # Только последний матч - одна строка по индексу
+    last_match = await db.get_last_match(user_id)
     
-    if not matches:
+    if not last_match:
         await callback.answer("❌ Матчи не найдены", show_alert=True)
         return
     
-    last_match = matches[0]  # Первый в списке = последний по времени
-    
     profile_text = format_profile_text(last_match, show_contact=True)
     
     await callback.message.edit_text(
@@ -298,45 +356,15 @@ async def view_last_match(callback: CallbackQuery):
     )
     await callback.answer()
 
-async def notify_about_like(bot: Bot, user_id: int):
-    """Уведомить пользователя о лайке"""
-    try:
-        await bot.send_message(
-            chat_id=user_id,
-            text=NEW_LIKE_NOTIFICATION,
-            reply_markup=kb.back_to_main()
-        )
-        logger.info(f"📨 Уведомление о лайке отправлено {user_id}")
-    except Exception as e:
-        logger.error(f"Ошибка отправки уведомления о лайке: {e}")
-
-async def notify_about_match(bot: Bot, user_id: int, match_user_id: int):
-    """Уведомить пользователя о матче"""
-    try:
-        match_user = db.get_user(match_user_id)
-        
-        if match_user:
-            text = f"🎉 У вас новый матч!\n\n{match_user['name']} лайкнул вас взаимно!"
-        else:
-            text = "🎉 У вас новый матч!"
-        
-        await bot.send_message(
-            chat_id=user_id,
-            text=text,
-            reply_markup=kb.back_to_main()
-        )
-        logger.info(f"📨 Уведомление о матче отправлено {user_id}")
-    except Exception as e:
-        logger.error(f"Ошибка отправки уведомления о матче: {e}")
-
 # Обработчики для состояния просмотра профилей
 @router.callback_query(F.data == "main_menu", SearchStates.browsing_profiles)
 async def exit_search(callback: CallbackQuery, state: FSMContext):
     """Выйти из поиска в главное меню"""
     await state.clear()
+    prefetcher.discard(callback.from_user.id)
     
     user_id = callback.from_user.id
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     has_profile = (user and user['name'] is not None)
     
     text = "🏠 Главное меню\n\nВыберите действие:"
@@ -8,21 +8,27 @@ from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 
-from database.database import Database
-from keyboards.keyboards import Keyboards
+from database.activity import activity_cutoff
+from utils.subscriptions import SubscriptionCache
 from utils.texts import (
     WELCOME_MESSAGE, SUBSCRIPTION_REQUIRED, SUBSCRIPTION_SUCCESS,
-    HELP_MESSAGE
+    HELP_MESSAGE, format_stats_text
 )
-from config.settings import Settings
+from utils.context import app_context
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-# Инициализация компонентов
-db = Database()
-kb = Keyboards()
-settings = Settings()
+# Общие компоненты
+db = app_context.db
+kb = app_context.kb
+settings = app_context.settings
+subscriptions = SubscriptionCache(
+    positive_ttl=settings.SUBSCRIPTION_TTL,
+    negative_ttl=settings.SUBSCRIPTION_NEGATIVE_TTL,
+    max_size=settings.SUBSCRIPTION_CACHE_SIZE,
+    revalidate_rate=settings.SUBSCRIPTION_REVALIDATE_RATE
+)
 
 @router.message(Command("start"))
 async def cmd_start(message: Message):
@@ -56,10 +62,8 @@ async def select_game(callback: CallbackQuery, bot: Bot):
     channel_id = settings.get_channel_id(game)
     
     try:
-        member = await bot.get_chat_member(channel_id, user_id)
-        
-        # Проверяем статус подписки
-        if member.status in ['member', 'administrator', 'creator']:
+        # Проверяем статус подписки (из кэша, если он свежий)
+        if await subscriptions.is_subscribed(bot, channel_id, user_id):
             # Пользователь подписан
             await handle_subscription_success(callback, game)
         else:
@@ -78,29 +82,8 @@ async def request_subscription(callback: CallbackQuery, game: str, channel_id: s
     text = SUBSCRIPTION_REQUIRED.format(channel=channel_id)
     text += f"\n\n🎮 Игра: {game_name}"
     
-    # Сохраняем выбранную игру в callback_data
-    keyboard = kb.confirm_subscription()
-    # Модифицируем callback_data чтобы передать игру
-    new_keyboard = []
-    for row in keyboard.inline_keyboard:
-        new_row = []
-        for button in row:
-            if button.callback_data == "check_subscription":
-                new_button = button.model_copy()
-                new_button.callback_data = f"check_subscription_{game}"
-                new_row.append(new_button)
-            elif button.callback_data == "recheck_subscription":
-                new_button = button.model_copy()
-                new_button.callback_data = f"recheck_subscription_{game}"
-                new_row.append(new_button)
-            else:
-                new_row.append(button)
-        new_keyboard.append(new_row)
-    
-    from aiogram.types import InlineKeyboardMarkup
-    modified_keyboard = InlineKeyboardMarkup(inline_keyboard=new_keyboard)
-    
-    await callback.message.edit_text(text, reply_markup=modified_keyboard)
+    # Выбранная игра передается в callback_data кнопок
+    await callback.message.edit_text(text, reply_markup=kb.confirm_subscription(game))
     await callback.answer()
 
 @router.callback_query(F.data.startswith("check_subscription_"))
@@ -111,9 +94,8 @@ async def check_subscription(callback: CallbackQuery, bot: Bot):
     channel_id = settings.get_channel_id(game)
     
     try:
-        member = await bot.get_chat_member(channel_id, user_id)
-        
-        if member.status in ['member', 'administrator', 'creator']:
+        # Пользователь говорит, что подписался - кэшу не доверяем
+        if await subscriptions.is_subscribed(bot, channel_id, user_id, force=True):
             await handle_subscription_success(callback, game)
         else:
             await callback.answer("❌ Вы еще не подписались на канал", show_alert=True)
@@ -133,17 +115,18 @@ async def handle_subscription_success(callback: CallbackQuery, game: str):
     username = callback.from_user.username
     
     # Создаем или обновляем пользователя в БД
-    user = db.get_user(user_id)
+    # Пользователь из архива уже возвращен ActivityMiddleware
+    user = await db.get_user(user_id)
     
     if not user:
-        success = db.create_user(user_id, username, game)
+        success = await db.create_user(user_id, username, game)
         if not success:
             await callback.answer("❌ Ошибка создания профиля", show_alert=True)
             return
-        user = db.get_user(user_id)
+        user = await db.get_user(user_id)
     
     # Обновляем активность
-    db.update_last_activity(user_id)
+    await db.update_last_activity(user_id)
     
     # Проверяем есть ли заполненная анкета
     has_profile = (user and user['name'] is not None)
@@ -155,7 +138,7 @@ async def handle_subscription_success(callback: CallbackQuery, game: str):
 async def show_main_menu_callback(callback: CallbackQuery):
     """Показать главное меню из callback"""
     user_id = callback.from_user.id
-    user = db.get_user(user_id)
+    user = await db.get_user(user_id)
     
     if not user:
         # Если пользователя нет, возвращаем к выбору игры
@@ -192,7 +175,7 @@ async def cmd_admin(message: Message):
         await message.answer("❌ У вас нет прав администратора")
         return
     
-    stats = db.get_stats()
+    stats = await db.get_stats()
     
     text = (
         "👑 Админ панель\n\n"
@@ -207,6 +190,32 @@ async def cmd_admin(message: Message):
     
     await message.answer(text, reply_markup=kb.admin_menu())
 
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """Статистика для админа"""
+    if message.from_user.id != settings.ADMIN_ID:
+        await message.answer("❌ У вас нет прав администратора")
+        return
+    
+    stats = await db.get_stats()
+    cache_stats = db.get_cache_stats()
+    
+    text = format_stats_text(stats)
+    text += (
+        f"\n\n🗃️ Кэш анкет: {cache_stats['size']} записей, "
+        f"попаданий {cache_stats['hit_rate'] * 100:.1f}% "
+        f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})"
+    )
+    
+    subscription_stats = subscriptions.stats()
+    text += (
+        f"\n📢 Кэш подписок: {subscription_stats['size']} записей, "
+        f"попаданий {subscription_stats['hit_rate'] * 100:.1f}% "
+        f"({subscription_stats['hits']}/{subscription_stats['hits'] + subscription_stats['misses']})"
+    )
+    
+    await message.answer(text)
+
 @router.callback_query(F.data.startswith("admin_"))
 async def handle_admin_actions(callback: CallbackQuery):
     """Обработка админ действий"""
@@ -217,26 +226,13 @@ async def handle_admin_actions(callback: CallbackQuery):
     action = callback.data.split("_")[1]
     
     if action == "stats":
-        stats = db.get_stats()
+        stats = await db.get_stats()
         
-        text = (
-            "📊 Детальная статистика:\n\n"
-            f"👥 Всего пользователей: {stats['total_users']}\n"
-            f"🎮 Dota 2: {stats['dota_users']}\n"
-            f"🔫 CS2: {stats['cs_users']}\n"
-            f"🔥 Активных за неделю: {stats['active_users']}\n"
-            f"💖 Матчей: {stats['total_matches']}\n"
-            f"👍 Лайков сегодня: {stats['today_likes']}\n\n"
-            f"📈 Активность: {(stats['active_users'] / max(stats['total_users'], 1) * 100):.1f}%"
-        )
-        
-        await callback.message.edit_text(text, reply_markup=kb.back_to_main())
+        await callback.message.edit_text(format_stats_text(stats), reply_markup=kb.back_to_main())
     
     elif action == "users":
         # Показать последних пользователей
-        users = db._execute_query(
-            "SELECT telegram_id, username, game, name, created_at FROM users ORDER BY created_at DESC LIMIT 10"
-        )
+        users = await db.get_recent_users(10)
         
         text = "👥 Последние 10 пользователей:\n\n"
         
@@ -247,21 +243,47 @@ async def handle_admin_actions(callback: CallbackQuery):
         await callback.message.edit_text(text, reply_markup=kb.back_to_main())
     
     elif action == "cleanup":
-        # Очистка неактивных пользователей (пример)
-        from datetime import datetime, timedelta
-        
-        month_ago = (datetime.now() - timedelta(days=30)).isoformat()
-        inactive_count = len(db._execute_query(
-            "SELECT id FROM users WHERE last_activity < ?", 
-            (month_ago,)
-        ))
+        # Очистка неактивных пользователей
+        cutoff = activity_cutoff(settings.PURGE_INACTIVE_DAYS)
+        inactive_count = await db.count_inactive_users(cutoff)
         
         text = (
             f"🧹 Очистка базы данных\n\n"
-            f"Найдено неактивных пользователей (более 30 дней): {inactive_count}\n\n"
-            f"🚧 Функция автоочистки в разработке"
+            f"Найдено неактивных пользователей (более {settings.PURGE_INACTIVE_DAYS} дней): {inactive_count}"
         )
         
-        await callback.message.edit_text(text, reply_markup=kb.back_to_main())
+        await callback.message.edit_text(text, reply_markup=kb.admin_cleanup(inactive_count > 0))
+    
+    elif action == "purge":
+        # Удаление необратимо - сначала показываем, сколько пользователей затронет
+        cutoff = activity_cutoff(settings.PURGE_INACTIVE_DAYS)
+        inactive_count = await db.count_inactive_users(cutoff)
+        
+        if inactive_count:
+            text = (
+                f"⚠️ Будет безвозвратно удалено пользователей: {inactive_count}\n"
+                f"(нет активности более {settings.PURGE_INACTIVE_DAYS} дней)\n\n"
+                f"Вы уверены?"
+            )
+            await callback.message.edit_text(text, reply_markup=kb.admin_purge_confirm())
+        else:
+            await callback.message.edit_text(
+                "✅ Неактивных пользователей нет",
+                reply_markup=kb.back_to_main()
+            )
+    
+    elif action == "purgeconfirm":
+        await callback.message.edit_text("⏳ Удаление неактивных пользователей...")
+        
+        # Удаляем пачками, чтобы не блокировать базу для остальных пользователей
+        deleted = await db.purge_inactive_users(
+            activity_cutoff(settings.PURGE_INACTIVE_DAYS),
+            settings.PURGE_BATCH_SIZE
+        )
+        
+        await callback.message.edit_text(
+            f"✅ Удалено неактивных пользователей: {deleted}",
+            reply_markup=kb.back_to_main()
+        )
     
     await callback.answer()
\ No newline at end of file
@@ -3,16 +3,74 @@
 Клавиатуры для бота поиска сокомандников
 """
 
+from collections import OrderedDict
+from functools import wraps
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import Dict, List
-from config.settings import Settings
+from typing import Callable, Dict, FrozenSet, List, Tuple
+from config.settings import Settings, get_settings
+
+def cached(method: Callable[..., InlineKeyboardMarkup]) -> Callable[..., InlineKeyboardMarkup]:
+    """Клавиатура строится один раз для каждого набора аргументов"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        markup = self._keyboards.get(key)
+        if markup is None:
+            markup = self._keyboards[key] = method(self, *args, **kwargs)
+        return markup
+    return wrapper
+
+def cached_recent(method: Callable[..., InlineKeyboardMarkup]) -> Callable[..., InlineKeyboardMarkup]:
+    """Как cached, но для клавиатур с id пользователя: хранятся последние RECENT_SIZE"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        markup = self._recent.get(key)
+        if markup is None:
+            markup = self._recent[key] = method(self, *args, **kwargs)
+            if len(self._recent) > self.RECENT_SIZE:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(key)
+        return markup
+    return wrapper
 
 class Keyboards:
-    """Класс для создания клавиатур"""
+    """Класс для создания клавиатур.
+    
+    Клавиатуры не меняются после создания, поэтому каждая строится один раз:
+    статические - при запуске, остальные - при первом запросе. Обработчики
+    не должны изменять полученные клавиатуры.
+    """
     
-    def __init__(self):
-        self.settings = Settings()
+    RECENT_SIZE = 10000
+    
+    def __init__(self, settings: Settings = None):
+        self.settings = settings or get_settings()
+        self._keyboards: Dict[Tuple, InlineKeyboardMarkup] = {}
+        self._recent: "OrderedDict[Tuple, InlineKeyboardMarkup]" = OrderedDict()
+        self._precompute()
+    
+    def _precompute(self):
+        """Построение статических клавиатур при запуске"""
+        for game in ("dota", "cs"):
+            self.confirm_subscription(game)
+            self.rating_options(game)
+            self.position_options(game)
+            self.position_options(game, multiselect=True)
+            self.search_filters(game)
+        
+        for has_profile in (False, True):
+            self.main_menu(has_profile)
+        
+        for build in (
+            self.game_selection, self.profile_actions, self.confirm_delete, self.skip_photo,
+            self.after_like, self.after_match, self.no_results, self.admin_menu, self.back_to_main,
+            self.admin_purge_confirm
+        ):
+            build()
     
+    @cached
     def game_selection(self) -> InlineKeyboardMarkup:
         """Выбор игры при старте"""
         buttons = [
@@ -21,6 +79,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def main_menu(self, has_profile: bool = False) -> InlineKeyboardMarkup:
         """Главное меню"""
         buttons = []
@@ -37,14 +96,17 @@ class Keyboards:
         
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
-    def confirm_subscription(self) -> InlineKeyboardMarkup:
-        """Подтверждение подписки"""
+    @cached
+    def confirm_subscription(self, game: str = None) -> InlineKeyboardMarkup:
+        """Подтверждение подписки (с игрой в callback_data, если она указана)"""
+        suffix = f"_{game}" if game else ""
         buttons = [
-            [InlineKeyboardButton(text="✅ Я подписался", callback_data="check_subscription")],
-            [InlineKeyboardButton(text="🔄 Проверить снова", callback_data="recheck_subscription")]
+            [InlineKeyboardButton(text="✅ Я подписался", callback_data=f"check_subscription{suffix}")],
+            [InlineKeyboardButton(text="🔄 Проверить снова", callback_data=f"recheck_subscription{suffix}")]
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def rating_options(self, game: str) -> InlineKeyboardMarkup:
         """Опции рейтинга для игры"""
         buttons = []
@@ -57,9 +119,17 @@ class Keyboards:
     
     def position_options(self, game: str, multiselect: bool = False, selected: List[str] = None) -> InlineKeyboardMarkup:
         """Опции позиций для игры"""
-        if selected is None:
-            selected = []
-        
+        # Порядок выбора на клавиатуру не влияет - ключ кэша по множеству позиций
+        if multiselect:
+            options = self.settings.get_position_options(game)
+            chosen = frozenset(selected or ()).intersection(options)
+        else:
+            chosen = frozenset()
+        return self._position_options(game, multiselect, chosen)
+    
+    @cached
+    def _position_options(self, game: str, multiselect: bool, selected: FrozenSet[str]) -> InlineKeyboardMarkup:
+        """Построение клавиатуры позиций"""
         buttons = []
         options = self.settings.get_position_options(game)
         
@@ -90,6 +160,7 @@ class Keyboards:
         
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def profile_actions(self) -> InlineKeyboardMarkup:
         """Действия с профилем"""
         buttons = [
@@ -97,6 +168,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def search_filters(self, game: str) -> InlineKeyboardMarkup:
         """Фильтры поиска"""
         buttons = [
@@ -107,6 +179,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached_recent
     def search_actions(self, target_user_id: int) -> InlineKeyboardMarkup:
         """Действия при просмотре анкеты в поиске"""
         buttons = [
@@ -118,6 +191,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached_recent
     def like_actions(self, target_user_id: int) -> InlineKeyboardMarkup:
         """Действия с лайком"""
         buttons = [
@@ -129,6 +203,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached_recent
     def contact_user(self, username: str) -> InlineKeyboardMarkup:
         """Связаться с пользователем"""
         buttons = []
@@ -140,6 +215,7 @@ class Keyboards:
         
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def confirm_delete(self) -> InlineKeyboardMarkup:
         """Подтверждение удаления анкеты"""
         buttons = [
@@ -150,6 +226,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def skip_photo(self) -> InlineKeyboardMarkup:
         """Пропустить фото"""
         buttons = [
@@ -158,6 +235,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def after_like(self) -> InlineKeyboardMarkup:
         """После отправки лайка"""
         buttons = [
@@ -166,6 +244,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def after_match(self) -> InlineKeyboardMarkup:
         """После создания матча"""
         buttons = [
@@ -175,6 +254,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def no_results(self) -> InlineKeyboardMarkup:
         """Нет результатов"""
         buttons = [
@@ -183,6 +263,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def admin_menu(self) -> InlineKeyboardMarkup:
         """Админ меню"""
         buttons = [
@@ -192,6 +273,41 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
+    def admin_cleanup(self, can_purge: bool) -> InlineKeyboardMarkup:
+        """Подтверждение очистки неактивных пользователей"""
+        buttons = []
+        
+        if can_purge:
+            buttons.append([InlineKeyboardButton(text="🗑️ Удалить неактивных", callback_data="admin_purge")])
+        
+        buttons.append([InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @cached
+    def admin_purge_confirm(self) -> InlineKeyboardMarkup:
+        """Подтверждение безвозвратного удаления неактивных пользователей"""
+        buttons = [
+            [InlineKeyboardButton(text="✅ Да, удалить", callback_data="admin_purgeconfirm")],
+            [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_cleanup")]
+        ]
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    def matches_page(self, next_match_id: int = None, shown: int = 0) -> InlineKeyboardMarkup:
+        """Навигация по списку матчей"""
+        buttons = []
+        
+        if next_match_id is not None:
+            buttons.append([InlineKeyboardButton(
+                text="▶️ Еще матчи", callback_data=f"matches_after_{next_match_id}_{shown}"
+            )])
+        
+        buttons.append([InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")])
+        
+        return InlineKeyboardMarkup(inline_keyboard=buttons)
+    
+    @cached
     def back_to_main(self) -> InlineKeyboardMarkup:
         """Кнопка назад в главное меню"""
         buttons = [
@@ -199,6 +315,7 @@ class Keyboards:
         ]
         return InlineKeyboardMarkup(inline_keyboard=buttons)
     
+    @cached
     def profile_actions(self) -> InlineKeyboardMarkup:
         """Действия с профилем после просмотра"""
         buttons = [
@@ -8,11 +8,13 @@ import asyncio
 import logging
 import os
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
-from config.settings import Settings
-from database.database import Database
+from database.fsm_storage import create_fsm_storage
 from handlers import start, profile, search, likes
+from utils.context import app_context
+from utils.notifications import notifications
+from utils.webhook import UpdateRecorder, run_webhook
+from utils.middlewares import ActivityMiddleware
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,20 +30,20 @@ logger = logging.getLogger(__name__)
 async def main():
     """Основная функция запуска бота"""
     
-    # Инициализация настроек
-    settings = Settings()
+    # Общие настройки, база данных и клавиатуры (те же, что у обработчиков)
+    settings = app_context.settings
     
     # Проверка конфигурации
     if not settings.validate():
         logger.error("❌ Ошибка в конфигурации. Проверьте настройки.")
         return
     
-    # Инициализация базы данных
-    db = Database()
+    db = app_context.db
     
     # Создание бота и диспетчера
     bot = Bot(token=settings.BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
+    storage = create_fsm_storage(settings, db)
+    dp = Dispatcher(storage=storage)
     
     # Регистрация роутеров
     # Важно: роутеры с FSM состояниями должны быть первыми!
@@ -52,6 +54,28 @@ async def main():
     
     logger.info("📋 Роутеры зарегистрированы")
     
+    # Запись входящих обновлений для replay_updates.py
+    if settings.UPDATES_RECORD_PATH:
+        dp.update.outer_middleware(UpdateRecorder(settings.UPDATES_RECORD_PATH))
+        logger.info(f"📼 Обновления записываются в {settings.UPDATES_RECORD_PATH}")
+    
+    # Отметка активности на каждом обновлении; в базу пишется пачками в фоне
+    dp.update.outer_middleware(ActivityMiddleware(db))
+    db.start_activity_flusher()
+    
+    # Периодический перенос давно неактивных пользователей в архив
+    db.start_archiver(
+        settings.ARCHIVE_INTERVAL,
+        settings.ARCHIVE_INACTIVE_DAYS,
+        settings.ARCHIVE_BATCH_SIZE
+    )
+    
+    # Фоновая перепроверка подписок недавно активных пользователей
+    start.subscriptions.start(bot, settings.SUBSCRIPTION_REVALIDATE_INTERVAL)
+    
+    # Фоновая доставка уведомлений о лайках и матчах
+    notifications.start(bot, db, app_context.kb)
+    
     # Создание папки для данных
     os.makedirs('data', exist_ok=True)
     
@@ -59,7 +83,7 @@ async def main():
     
     # Уведомление админа о запуске
     try:
-        stats = db.get_stats()
+        stats = await db.get_stats()
         await bot.send_message(
             settings.ADMIN_ID, 
             f"🤖 TeammateBot успешно запущен!\n\n"
@@ -75,12 +99,26 @@ async def main():
         logger.warning(f"Не удалось отправить уведомление админу: {e}")
     
     try:
-        # Запуск polling
-        await dp.start_polling(bot, skip_updates=True)
+        if settings.BOT_MODE == "webhook":
+            await run_webhook(dp, bot, settings)
+        else:
+            # Запуск polling: webhook и накопившиеся обновления сбрасываем
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Ошибка при запуске бота: {e}")
     finally:
+        # Досылаем уведомления, пока сессия бота открыта
+        await start.subscriptions.close()
+        await notifications.close(settings.NOTIFY_SHUTDOWN_TIMEOUT)
         await bot.session.close()
+        
+        # Останавливаем предзагрузку анкет и сохраняем состояния FSM
+        search.prefetcher.close()
+        await storage.close()
+        
+        # Сбрасываем буферы и закрываем соединения с БД
+        app_context.close()
 
 if __name__ == "__main__":
     try:
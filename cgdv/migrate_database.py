@@ -0,0 +1,48 @@
+# migrate_database.py
+"""
+Скрипт применения миграций базы данных TeammateBot
+Обновляет схему без удаления данных. Бот применяет миграции и сам при старте.
+Запуск: python migrate_database.py
+"""
+
+import os
+import sqlite3
+
+from config.settings import Settings
+from database import migrations
+
+def migrate_database():
+    """Применение недостающих миграций"""
+    settings = Settings()
+    db_path = settings.DATABASE_PATH
+    
+    if not os.path.exists(db_path):
+        print("📊 База данных не существует, будет создана при запуске бота")
+        return True
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        current = migrations.get_version(conn)
+        latest = migrations.latest_version()
+        print(f"🗄️ Версия схемы: {current}, последняя: {latest}")
+        
+        if current >= latest:
+            print("✅ Схема актуальна")
+            return True
+        
+        for migration in migrations.MIGRATIONS:
+            if migration.version > current:
+                print(f"• {migration.version}: {migration.description}")
+        
+        version = migrations.migrate(conn, settings.MIGRATION_BATCH_SIZE)
+        print(f"✅ Миграции применены, версия схемы: {version}")
+        return True
+    except sqlite3.Error as e:
+        print(f"❌ Ошибка миграции: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print("🔄 Миграция базы данных TeammateBot")
+    migrate_database()
\ No newline at end of file
@@ -0,0 +1,100 @@
+# replay_updates.py
+"""
+Воспроизведение записанных обновлений на локальный webhook TeammateBot
+
+Обновления записываются ботом при заданном UPDATES_RECORD_PATH (по одному
+JSON на строку). Скрипт отправляет их на webhook с заданной параллельностью
+и выводит время ответа. Обработчики бота при этом обращаются к Telegram API
+с настроенным токеном.
+Запуск: python replay_updates.py updates.jsonl [--url URL] [--concurrency N] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import List
+
+import aiohttp
+
+from config.settings import Settings
+
+def load_updates(path: str) -> List[dict]:
+    """Чтение обновлений из JSONL"""
+    updates = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                updates.append(json.loads(line))
+    return updates
+
+async def replay(url: str, secret: str, updates: List[dict], concurrency: int) -> List[float]:
+    """Отправка обновлений; возвращает время ответа каждого (сек), ошибки - отрицательные"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def send(update: dict) -> float:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.post(url, json=update) as response:
+                        await response.read()
+                        elapsed = time.perf_counter() - started
+                        if response.status != 200:
+                            print(f"❌ update_id={update.get('update_id')}: HTTP {response.status}")
+                            return -elapsed
+                        return elapsed
+                except aiohttp.ClientError as e:
+                    print(f"❌ update_id={update.get('update_id')}: {e}")
+                    return -(time.perf_counter() - started)
+        
+        return await asyncio.gather(*(send(update) for update in updates))
+
+def percentile(values: List[float], share: float) -> float:
+    """Перцентиль отсортированного списка"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * share))
+    return values[index]
+
+def main() -> int:
+    """Основная функция воспроизведения"""
+    settings = Settings()
+    default_url = f"http://127.0.0.1:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}"
+    
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных обновлений")
+    parser.add_argument("path", help="файл JSONL с обновлениями")
+    parser.add_argument("--url", default=default_url, help=f"адрес webhook (по умолчанию {default_url})")
+    parser.add_argument("--concurrency", type=int, default=10, help="одновременных запросов")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз повторить запись")
+    args = parser.parse_args()
+    
+    updates = load_updates(args.path) * max(1, args.repeat)
+    if not updates:
+        print("⚠️ Нет обновлений для воспроизведения")
+        return 1
+    
+    print(f"▶️ Воспроизведение {len(updates)} обновлений на {args.url}")
+    started = time.perf_counter()
+    results = asyncio.run(replay(args.url, settings.WEBHOOK_SECRET, updates, args.concurrency))
+    total = time.perf_counter() - started
+    
+    ok = sorted(value for value in results if value >= 0)
+    failed = len(results) - len(ok)
+    
+    print("\n" + "=" * 40)
+    print(f"📊 Успешно: {len(ok)}, ошибок: {failed}, за {total:.2f} с ({len(results) / total:.1f} обн/с)")
+    if ok:
+        print(
+            f"⏱️ p50: {percentile(ok, 0.5) * 1000:.1f} мс, "
+            f"p95: {percentile(ok, 0.95) * 1000:.1f} мс, "
+            f"max: {ok[-1] * 1000:.1f} мс"
+        )
+    
+    return 0 if failed == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
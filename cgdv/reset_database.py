@@ -1,7 +1,7 @@
 # reset_database.py
 """
 Скрипт для сброса базы данных TeammateBot
-Используйте если возникли проблемы с миграциями
+Удаляет все данные! Для обновления схемы используйте migrate_database.py
 """
 
 import os
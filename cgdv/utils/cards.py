@@ -0,0 +1,105 @@
+# utils/cards.py
+"""
+Рендер карточек анкет по шаблонам с кэшем
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import Settings, get_settings
+
+class CardTemplate:
+    """Шаблон карточки для одной игры: формат и подписи рейтингов и позиций"""
+    
+    HEAD = "👤 {name}\n🎮 {nickname}\n🎂 {age} лет\n🏆 {rating}\n"
+    
+    def __init__(self, ratings: Dict[str, str], positions: Dict[str, str]):
+        self.ratings = ratings
+        self.positions = positions
+    
+    def render(self, user: Dict[str, Any]) -> str:
+        """Карточка без контакта"""
+        rating = user['rating']
+        parts = [self.HEAD.format(
+            name=user['name'],
+            nickname=user['nickname'],
+            age=user['age'],
+            rating=self.ratings.get(rating, rating)
+        )]
+        
+        if user['positions']:
+            labels = self.positions
+            parts.append(f"⚔️ {', '.join([labels.get(pos, pos) for pos in user['positions']])}\n")
+        
+        if user['additional_info']:
+            parts.append(f"\n📝 {user['additional_info']}\n")
+        
+        return "".join(parts)
+
+class CardRenderer:
+    """Рендер карточек анкет.
+    
+    Шаблоны собираются один раз на игру. Готовая карточка хранится по
+    telegram_id вместе с версией анкеты: profile_version растет при каждом
+    изменении, created_at отличает заново созданную анкету. После
+    обновления анкеты старый текст не используется; ``invalidate`` сразу
+    освобождает запись.
+    """
+    
+    def __init__(self, settings: Settings = None, max_size: int = None):
+        settings = settings or get_settings()
+        self.max_size = max(1, max_size if max_size is not None else settings.CARD_CACHE_SIZE)
+        self._templates: Dict[str, CardTemplate] = {
+            game: CardTemplate(settings.get_rating_options(game), settings.get_position_options(game))
+            for game in ("dota", "cs")
+        }
+        self._fallback = CardTemplate({}, {})
+        # telegram_id -> (версия анкеты, карточка без контакта)
+        self._cards: "OrderedDict[int, Tuple[Tuple, str]]" = OrderedDict()
+    
+    def render(self, user: Dict[str, Any], show_contact: bool = False) -> str:
+        """Текст карточки анкеты"""
+        card = self._card(user)
+        if show_contact and user.get('username'):
+            return f"{card}\n💬 @{user['username']}"
+        return card
+    
+    def render_many(self, users: Iterable[Dict[str, Any]], show_contact: bool = False) -> List[str]:
+        """Карточки для страницы анкет"""
+        return [self.render(user, show_contact) for user in users]
+    
+    def _card(self, user: Dict[str, Any]) -> str:
+        """Карточка без контакта из кэша или по шаблону"""
+        telegram_id = user.get('telegram_id')
+        if telegram_id is None or user.get('profile_version') is None:
+            return self._template(user).render(user)
+        version = (user.get('created_at'), user['profile_version'])
+        
+        cached = self._cards.get(telegram_id)
+        if cached is not None and cached[0] == version:
+            self._cards.move_to_end(telegram_id)
+            return cached[1]
+        
+        card = self._template(user).render(user)
+        self._cards[telegram_id] = (version, card)
+        self._cards.move_to_end(telegram_id)
+        if len(self._cards) > self.max_size:
+            self._cards.popitem(last=False)
+        return card
+    
+    def _template(self, user: Dict[str, Any]) -> CardTemplate:
+        """Шаблон для игры анкеты"""
+        return self._templates.get(user.get('game'), self._fallback)
+    
+    def invalidate(self, telegram_id: int):
+        """Забыть карточку (анкета изменена или удалена)"""
+        self._cards.pop(telegram_id, None)
+
+_renderer: Optional[CardRenderer] = None
+
+def get_card_renderer() -> CardRenderer:
+    """Общий рендерер карточек"""
+    global _renderer
+    if _renderer is None:
+        _renderer = CardRenderer()
+    return _renderer
\ No newline at end of file
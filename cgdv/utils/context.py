@@ -0,0 +1,50 @@
+# utils/context.py
+"""
+Общие компоненты бота: настройки, база данных и клавиатуры
+"""
+
+from typing import Optional
+
+from config.settings import Settings, get_settings
+from database.async_database import AsyncDatabase
+from keyboards.keyboards import Keyboards
+
+class AppContext:
+    """Один набор компонентов на процесс.
+    
+    Обработчики берут базу, клавиатуры и настройки отсюда, поэтому схема БД
+    проверяется один раз, пул соединений и буфер активности общие, а
+    окружение читается только при создании настроек. Компоненты создаются
+    при первом обращении - при импорте обработчиков во время запуска.
+    """
+    
+    def __init__(self):
+        self._db: Optional[AsyncDatabase] = None
+        self._kb: Optional[Keyboards] = None
+    
+    @property
+    def settings(self) -> Settings:
+        """Настройки"""
+        return get_settings()
+    
+    @property
+    def db(self) -> AsyncDatabase:
+        """Неблокирующий доступ к базе данных"""
+        if self._db is None:
+            self._db = AsyncDatabase()
+        return self._db
+    
+    @property
+    def kb(self) -> Keyboards:
+        """Клавиатуры"""
+        if self._kb is None:
+            self._kb = Keyboards(self.settings)
+        return self._kb
+    
+    def close(self):
+        """Сброс буферов и закрытие соединений с БД"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+app_context = AppContext()
\ No newline at end of file
@@ -0,0 +1,48 @@
+# utils/middlewares.py
+"""
+Промежуточные обработчики обновлений
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from database.async_database import AsyncDatabase
+
+logger = logging.getLogger(__name__)
+
+class ActivityMiddleware(BaseMiddleware):
+    """Отметка активности пользователя на каждом обновлении.
+    
+    Пользователь, перенесенный в архив за неактивность, возвращается из
+    архива при первом собственном обновлении - до обработчиков, которые
+    иначе сочли бы, что анкеты у него нет. Чтение чужих анкет архив не
+    трогает.
+    
+    Отметка попадает в буфер AsyncDatabase и пишется в базу пачкой, так что
+    обработка обновления не ждет запроса. По last_activity работают очистка
+    и архивация неактивных пользователей, поэтому активность нужна от любых
+    действий, а не только от выбора игры и сохранения анкеты.
+    """
+    
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: User = data.get("event_from_user")
+        if user is not None and not user.is_bot:
+            try:
+                if await self.db.get_user(user.id) is None:
+                    await self.db.restore_user(user.id)
+                await self.db.update_last_activity(user.id)
+            except Exception as e:
+                logger.error(f"Ошибка отметки активности {user.id}: {e}")
+        
+        return await handler(event, data)
\ No newline at end of file
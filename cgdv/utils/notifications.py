@@ -0,0 +1,287 @@
+# utils/notifications.py
+"""
+Очередь уведомлений о лайках и матчах
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from config.settings import get_settings
+from database.async_database import AsyncDatabase
+from keyboards.keyboards import Keyboards
+from utils.texts import format_likes_digest, format_match_notification
+
+logger = logging.getLogger(__name__)
+
+class PendingNotice:
+    """Накопленные для одного получателя события"""
+    
+    def __init__(self):
+        self.likes = 0
+        self.matches: List[int] = []
+        # Режим дайджеста: нужен дайджест и число лайков, под которое уже занят слот
+        self.digest = False
+        self.claimed: Optional[int] = None
+    
+    def merge(self, other: "PendingNotice"):
+        """Добавить события из другого набора"""
+        self.likes += other.likes
+        self.matches.extend(other.matches)
+        self.digest = self.digest or other.digest
+        if other.claimed is not None:
+            # Более поздний слот уже включает лайки из более раннего
+            self.claimed = max(self.claimed or 0, other.claimed)
+
+class NotificationQueue:
+    """Фоновая доставка уведомлений с ограничением скорости.
+    
+    Обработчики только ставят события в очередь. Воркеры отправляют не
+    больше ``rate`` сообщений в секунду суммарно и не чаще одного сообщения
+    в ``chat_interval`` секунд одному получателю. Все события получателя,
+    накопившиеся к моменту отправки, уходят одним сообщением: лайки
+    сворачиваются в счетчик, матчи перечисляются. Временные ошибки
+    повторяются с экспоненциальной задержкой.
+    
+    В режиме ``digest`` о лайках приходит не больше одного сообщения за
+    ``digest_window`` секунд с числом непросмотренных лайков из like_inbox.
+    """
+    
+    def __init__(self, rate: float = 25, chat_interval: float = 1.0, coalesce_window: float = 3.0,
+                 max_retries: int = 5, backoff: float = 1.0, workers: int = 4,
+                 likes_mode: str = "digest", digest_window: int = 1800):
+        self.rate = max(rate, 0.1)
+        self.chat_interval = chat_interval
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.workers = max(1, workers)
+        self.likes_mode = likes_mode
+        self.digest_window = digest_window
+        
+        self.bot: Optional[Bot] = None
+        self.db: Optional[AsyncDatabase] = None
+        self.kb: Optional[Keyboards] = None
+        
+        self._pending: Dict[int, PendingNotice] = {}
+        self._attempts: Dict[int, int] = {}
+        self._next_chat_send: Dict[int, float] = {}
+        self._next_slot = 0.0
+        
+        # Очередь получателей по времени отправки: (когда, порядковый номер, chat_id)
+        self._heap: List[Tuple[float, int, int]] = []
+        self._scheduled: Set[int] = set()
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._in_flight = 0
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self, bot: Bot, db: AsyncDatabase, kb: Keyboards):
+        """Запуск воркеров доставки"""
+        self.bot = bot
+        self.db = db
+        self.kb = kb
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    def notify_like(self, user_id: int):
+        """Поставить в очередь уведомление о новом лайке"""
+        notice = self._pending.setdefault(user_id, PendingNotice())
+        if self.likes_mode == "digest":
+            notice.digest = True
+        else:
+            notice.likes += 1
+        # Небольшая задержка, чтобы серия лайков ушла одним сообщением
+        self._schedule(user_id, time.monotonic() + self.coalesce_window)
+    
+    def notify_match(self, user_id: int, match_user_id: int):
+        """Поставить в очередь уведомление о матче"""
+        self._pending.setdefault(user_id, PendingNotice()).matches.append(match_user_id)
+        self._schedule(user_id, time.monotonic(), reschedule=True)
+    
+    def _schedule(self, chat_id: int, due: float, reschedule: bool = False):
+        """Запланировать отправку получателю"""
+        due = max(due, self._next_chat_send.get(chat_id, 0.0))
+        
+        if chat_id in self._scheduled:
+            if not reschedule:
+                return
+            # Матч не ждет окна группировки лайков
+            self._heap = [item for item in self._heap if item[2] != chat_id]
+            heapq.heapify(self._heap)
+        
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, chat_id))
+        self._scheduled.add(chat_id)
+        self._wakeup.set()
+    
+    async def _next_chat(self) -> int:
+        """Дождаться получателя, которому пора отправлять"""
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            due, _, chat_id = self._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heapq.heappop(self._heap)
+            self._scheduled.discard(chat_id)
+            return chat_id
+    
+    async def _acquire_slot(self):
+        """Общий лимит скорости отправки"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def _worker(self):
+        """Цикл доставки уведомлений"""
+        while True:
+            chat_id = await self._next_chat()
+            notice = self._pending.pop(chat_id, None)
+            if notice is None:
+                continue
+            
+            self._in_flight += 1
+            try:
+                await self._deliver(chat_id, notice)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка доставки уведомления {chat_id}: {e}")
+            finally:
+                self._in_flight -= 1
+    
+    async def _render(self, notice: PendingNotice) -> str:
+        """Текст одного сообщения со всеми накопленными событиями"""
+        parts = []
+        for match_user_id in notice.matches:
+            match_user = await self.db.get_user(match_user_id) if self.db else None
+            parts.append(format_match_notification(match_user['name'] if match_user else None))
+        if notice.claimed:
+            parts.append(format_likes_digest(notice.claimed))
+        elif notice.likes:
+            parts.append(format_likes_digest(notice.likes))
+        return "\n\n".join(parts)
+    
+    async def _claim_digest(self, chat_id: int, notice: PendingNotice):
+        """Занять слот дайджеста; если окно еще не прошло - отложить лайки"""
+        notice.digest = False
+        count, retry_at = await self.db.claim_likes_digest(
+            chat_id, int(time.time()), self.digest_window
+        )
+        
+        if count:
+            notice.claimed = count
+        elif retry_at is not None:
+            later = self._pending.setdefault(chat_id, PendingNotice())
+            later.digest = True
+            self._schedule(chat_id, time.monotonic() + max(0, retry_at - time.time()))
+    
+    async def _deliver(self, chat_id: int, notice: PendingNotice):
+        """Отправка с повтором при временных ошибках"""
+        now = time.monotonic()
+        if len(self._next_chat_send) > 10000:
+            # Забываем получателей, для которых интервал уже истек
+            self._next_chat_send = {
+                chat: moment for chat, moment in self._next_chat_send.items() if moment > now
+            }
+        self._next_chat_send[chat_id] = now + self.chat_interval
+        
+        if notice.digest and notice.claimed is None and self.db:
+            await self._claim_digest(chat_id, notice)
+        
+        text = await self._render(notice)
+        if not text:
+            # Лайки уже просмотрены или дайджест отложен
+            return
+        
+        await self._acquire_slot()
+        
+        try:
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                reply_markup=self.kb.back_to_main()
+            )
+        except TelegramRetryAfter as e:
+            # Флуд-контроль: притормаживаем всю отправку
+            self._next_slot = max(self._next_slot, time.monotonic() + e.retry_after)
+            self._retry(chat_id, notice, e.retry_after)
+            return
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Бот заблокирован или чат недоступен - повтор не поможет
+            logger.warning(f"⚠️ Уведомление {chat_id} не доставлено: {e}")
+            self._attempts.pop(chat_id, None)
+            return
+        except Exception as e:
+            attempt = self._attempts.get(chat_id, 0)
+            logger.warning(f"⚠️ Ошибка отправки уведомления {chat_id} (попытка {attempt + 1}): {e}")
+            self._retry(chat_id, notice, self.backoff * 2 ** attempt)
+            return
+        
+        self._attempts.pop(chat_id, None)
+        logger.info(
+            f"📨 Уведомление отправлено {chat_id}: "
+            f"лайков {notice.claimed or notice.likes}, матчей {len(notice.matches)}"
+        )
+    
+    def _retry(self, chat_id: int, notice: PendingNotice, delay: float):
+        """Вернуть события в очередь для повторной отправки"""
+        attempt = self._attempts.get(chat_id, 0) + 1
+        if attempt > self.max_retries:
+            logger.error(f"❌ Уведомление {chat_id} отброшено после {self.max_retries} попыток")
+            self._attempts.pop(chat_id, None)
+            return
+        
+        self._attempts[chat_id] = attempt
+        pending = self._pending.setdefault(chat_id, PendingNotice())
+        pending.merge(notice)
+        self._schedule(chat_id, time.monotonic() + delay, reschedule=True)
+    
+    async def close(self, timeout: float = 5.0):
+        """Дослать то, что успеет за ``timeout`` секунд, и остановить воркеров"""
+        if self._tasks:
+            # Накопленное отправляем без ожидания окна группировки
+            for chat_id in list(self._scheduled):
+                self._schedule(chat_id, time.monotonic(), reschedule=True)
+            
+            deadline = time.monotonic() + timeout
+            while (self._heap or self._in_flight) and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        if self._pending:
+            logger.warning(f"⚠️ Не доставлено уведомлений при остановке: {len(self._pending)}")
+
+settings = get_settings()
+notifications = NotificationQueue(
+    rate=settings.NOTIFY_RATE,
+    chat_interval=settings.NOTIFY_CHAT_INTERVAL,
+    coalesce_window=settings.NOTIFY_COALESCE_WINDOW,
+    max_retries=settings.NOTIFY_MAX_RETRIES,
+    backoff=settings.NOTIFY_BACKOFF,
+    workers=settings.NOTIFY_WORKERS,
+    likes_mode=settings.NOTIFY_LIKES_MODE,
+    digest_window=settings.NOTIFY_DIGEST_WINDOW
+)
\ No newline at end of file
@@ -0,0 +1,199 @@
+# utils/prefetch.py
+"""
+Фоновая подготовка следующих анкет в поиске
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from database.async_database import AsyncDatabase
+from database.search_session import SearchCursor
+from keyboards.keyboards import Keyboards
+from utils.cards import get_card_renderer
+
+logger = logging.getLogger(__name__)
+
+class ProfileCard(NamedTuple):
+    """Готовая к отправке карточка анкеты"""
+    telegram_id: int
+    text: str
+    keyboard: Any
+    photo_id: Optional[str]
+
+class PendingPage(NamedTuple):
+    """Заранее загруженная страница для курсора в известной позиции"""
+    position: Tuple
+    cursor: SearchCursor
+
+class SearchPrefetcher:
+    """Подготовка анкет N+1..N+k, пока пользователь смотрит анкету N.
+    
+    В фоне подгружается следующая страница курсора (если очередь скоро
+    закончится) и заранее рендерятся текст и клавиатура ближайших анкет,
+    так что при пропуске или лайке следующая карточка берется из памяти.
+    
+    Подготовленное хранится не дольше ``ttl`` секунд и не больше чем для
+    ``max_users`` пользователей: выйти из поиска можно не только через
+    главное меню, и ``discard`` вызывается не всегда.
+    """
+    
+    def __init__(self, db: AsyncDatabase, kb: Keyboards, depth: int = 3,
+                 page_size: int = 10, threshold: int = 2, ttl: float = 60,
+                 max_users: int = 10000):
+        self.db = db
+        self.kb = kb
+        self.depth = max(1, depth)
+        self.page_size = page_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_users = max(1, max_users)
+        
+        self._tasks: Dict[int, asyncio.Task] = {}
+        # Пользователь -> (когда подготовлено, страница или карточки), старые первыми
+        self._pages: "OrderedDict[int, Tuple[float, PendingPage]]" = OrderedDict()
+        self._cards: "OrderedDict[int, Tuple[float, Dict[int, ProfileCard]]]" = OrderedDict()
+    
+    @staticmethod
+    def _position(cursor: SearchCursor) -> Tuple:
+        """Позиция обхода курсора без учета очереди"""
+        return (cursor.filters, cursor.start_id, cursor.last_id, cursor.wrapped, cursor.exhausted)
+    
+    def render(self, profile: Dict[str, Any]) -> ProfileCard:
+        """Рендер карточки анкеты для поиска"""
+        return self.render_page([profile])[0]
+    
+    def render_page(self, profiles: List[Dict[str, Any]]) -> List[ProfileCard]:
+        """Рендер карточек нескольких анкет за один проход"""
+        texts = get_card_renderer().render_many(profiles)
+        return [
+            ProfileCard(
+                telegram_id=profile['telegram_id'],
+                text=text,
+                keyboard=self.kb.search_actions(profile['telegram_id']),
+                photo_id=profile.get('photo_id')
+            )
+            for profile, text in zip(profiles, texts)
+        ]
+    
+    def _remember(self, store: OrderedDict, user_id: int, value: Any):
+        """Сохранить подготовленное для пользователя с вытеснением самых старых"""
+        store[user_id] = (time.monotonic(), value)
+        store.move_to_end(user_id)
+        while len(store) > self.max_users:
+            store.popitem(last=False)
+    
+    def _prune(self):
+        """Удалить устаревшее (записи упорядочены по времени подготовки)"""
+        deadline = time.monotonic() - self.ttl
+        for store in (self._pages, self._cards):
+            while store:
+                prepared_at = next(iter(store.values()))[0]
+                if prepared_at >= deadline:
+                    break
+                store.popitem(last=False)
+    
+    def schedule(self, user_id: int, cursor: SearchCursor,
+                 rating_filter: str = None, position_filter: str = None):
+        """Запустить подготовку анкет, следующих за текущей"""
+        self._prune()
+        task = self._tasks.get(user_id)
+        if task is not None and not task.done():
+            task.cancel()
+        
+        # Копия, чтобы фоновая задача не меняла курсор из состояния
+        snapshot = SearchCursor.from_state(cursor.to_state())
+        task = asyncio.create_task(
+            self._prefetch(user_id, snapshot, rating_filter, position_filter)
+        )
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda done: self._forget_task(user_id, done))
+    
+    def _forget_task(self, user_id: int, task: asyncio.Task):
+        """Удалить завершенную задачу из реестра"""
+        if self._tasks.get(user_id) is task:
+            del self._tasks[user_id]
+    
+    async def _prefetch(self, user_id: int, cursor: SearchCursor,
+                        rating_filter: str, position_filter: str):
+        """Фоновая загрузка страницы и рендер ближайших карточек"""
+        try:
+            upcoming = cursor.queue[1:1 + self.depth]
+            
+            # После показа текущей анкеты в очереди останется на одну меньше
+            if cursor.needs_refill(self.threshold + 1):
+                position = self._position(cursor)
+                page = SearchCursor.from_state(cursor.to_state())
+                page.queue = []
+                await self.db.fetch_search_page(
+                    user_id, page, rating_filter, position_filter, self.page_size
+                )
+                self._remember(self._pages, user_id, PendingPage(position, page))
+                upcoming += page.queue[:self.depth - len(upcoming)]
+            
+            profiles = []
+            for profile_id in upcoming:
+                profile = await self.db.get_user(profile_id)
+                if profile and profile['name']:
+                    profiles.append(profile)
+            
+            self._remember(self._cards, user_id, {
+                card.telegram_id: card for card in self.render_page(profiles)
+            })
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка предзагрузки анкет для {user_id}: {e}")
+    
+    async def apply_page(self, user_id: int, cursor: SearchCursor) -> bool:
+        """Дополнить курсор заранее загруженной страницей, если она есть"""
+        task = self._tasks.get(user_id)
+        if task is not None and not task.done():
+            # Загрузка уже идет - дождаться ее быстрее, чем начинать заново
+            await asyncio.wait({task})
+        
+        item = self._pages.pop(user_id, None)
+        if item is None:
+            return False
+        
+        prepared_at, pending = item
+        if time.monotonic() - prepared_at >= self.ttl or pending.position != self._position(cursor):
+            return False
+        
+        page = pending.cursor
+        cursor.start_id = page.start_id
+        cursor.last_id = page.last_id
+        cursor.wrapped = page.wrapped
+        cursor.exhausted = page.exhausted
+        cursor.queue.extend(page.queue)
+        return True
+    
+    def take_card(self, user_id: int, profile_id: int) -> Optional[ProfileCard]:
+        """Готовая карточка анкеты (None, если ее нет или она устарела)"""
+        item = self._cards.get(user_id)
+        if item is None:
+            return None
+        
+        rendered_at, cards = item
+        if time.monotonic() - rendered_at >= self.ttl:
+            del self._cards[user_id]
+            return None
+        return cards.pop(profile_id, None)
+    
+    def discard(self, user_id: int):
+        """Забыть подготовленные данные пользователя (выход из поиска)"""
+        task = self._tasks.pop(user_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+        self._pages.pop(user_id, None)
+        self._cards.pop(user_id, None)
+    
+    def close(self):
+        """Остановить все фоновые задачи"""
+        for user_id in list(self._tasks):
+            self.discard(user_id)
+        self._pages.clear()
+        self._cards.clear()
\ No newline at end of file
@@ -0,0 +1,182 @@
+# utils/subscriptions.py
+"""
+Кэш проверок подписки на каналы
+
+Модуль не зависит от фреймворка: от бота нужен только метод
+get_chat_member(chat_id=..., user_id=...), который есть и в aiogram, и в
+python-telegram-bot, поэтому кэш используют оба бота (tgbot_for_cg
+импортирует его как cgdv.utils.subscriptions).
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Статусы участника канала, которые считаются подпиской
+MEMBER_STATUSES = ('member', 'administrator', 'creator')
+
+class Membership:
+    """Результат проверки подписки"""
+    
+    def __init__(self, subscribed: bool, expires_at: float, used_at: float):
+        self.subscribed = subscribed
+        self.expires_at = expires_at
+        # Когда результат последний раз нужен был пользователю
+        self.used_at = used_at
+
+class SubscriptionCache:
+    """Проверка подписки с кэшем и объединением одновременных запросов.
+    
+    Подписка запоминается на ``positive_ttl`` секунд, ее отсутствие - на
+    ``negative_ttl`` (короче, чтобы только что подписавшийся не ждал).
+    Одновременные проверки одного пользователя ждут один запрос к API.
+    Фоновая перепроверка заранее продлевает подписки тех, кто недавно
+    пользовался ботом, поэтому у них проверка не идет в сеть.
+    Ошибки API не кэшируются и передаются вызывающему.
+    """
+    
+    def __init__(self, positive_ttl: float = 600, negative_ttl: float = 30,
+                 max_size: int = 50000, revalidate_rate: float = 10):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max(1, max_size)
+        self.revalidate_rate = max(revalidate_rate, 0.1)
+        
+        self._entries: "OrderedDict[Tuple[Any, int], Membership]" = OrderedDict()
+        self._in_flight: Dict[Tuple[Any, int], asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        
+        self.hits = 0
+        self.misses = 0
+    
+    async def is_subscribed(self, bot, chat_id, user_id: int, force: bool = False) -> bool:
+        """Подписан ли пользователь на канал.
+        
+        ``force`` - не доверять кэшу (пользователь нажал «Я подписался»).
+        """
+        key = (chat_id, user_id)
+        now = time.monotonic()
+        
+        entry = self._entries.get(key)
+        if not force and entry is not None and entry.expires_at > now:
+            entry.used_at = now
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.subscribed
+        
+        self.misses += 1
+        subscribed = await self._fetch(bot, key)
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.used_at = time.monotonic()
+        return subscribed
+    
+    def _fetch(self, bot, key: Tuple[Any, int]) -> "asyncio.Future":
+        """Запрос к API; одновременные запросы одного ключа объединяются"""
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._request(bot, key))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._forget_request(key, done))
+        
+        # Отмена одного ожидающего не отменяет запрос для остальных
+        return asyncio.shield(future)
+    
+    def _forget_request(self, key: Tuple[Any, int], future: asyncio.Future):
+        """Удалить завершенный запрос из списка выполняющихся"""
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+    
+    async def _request(self, bot, key: Tuple[Any, int]) -> bool:
+        """Проверка подписки через API и сохранение результата"""
+        chat_id, user_id = key
+        member = await bot.get_chat_member(chat_id=chat_id, user_id=user_id)
+        subscribed = member.status in MEMBER_STATUSES
+        
+        now = time.monotonic()
+        ttl = self.positive_ttl if subscribed else self.negative_ttl
+        previous = self._entries.get(key)
+        self._entries[key] = Membership(
+            subscribed, now + ttl, previous.used_at if previous else now
+        )
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        
+        return subscribed
+    
+    def forget(self, chat_id, user_id: int):
+        """Забыть результат проверки пользователя"""
+        self._entries.pop((chat_id, user_id), None)
+    
+    async def revalidate(self, bot, ahead: float) -> int:
+        """Перепроверка подписок, которые истекут в ближайшие ``ahead`` секунд.
+        
+        Перепроверяются только подписки пользователей, которые обращались
+        к боту за последние ``positive_ttl`` секунд; просроченные записи
+        удаляются. Возвращает число перепроверенных записей.
+        """
+        now = time.monotonic()
+        due = []
+        for key, entry in list(self._entries.items()):
+            if entry.expires_at <= now:
+                del self._entries[key]
+            elif (entry.subscribed and entry.expires_at - now <= ahead
+                  and now - entry.used_at <= self.positive_ttl):
+                due.append(key)
+        
+        checked = 0
+        for key in due:
+            try:
+                await self._fetch(bot, key)
+                checked += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # При следующем обращении пользователя проверим заново
+                logger.warning(f"⚠️ Не удалось перепроверить подписку {key}: {e}")
+                self._entries.pop(key, None)
+            await asyncio.sleep(1 / self.revalidate_rate)
+        
+        return checked
+    
+    def start(self, bot, interval: float):
+        """Запуск фоновой перепроверки раз в ``interval`` секунд"""
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._revalidate_loop(bot, interval))
+    
+    async def _revalidate_loop(self, bot, interval: float):
+        """Периодическая перепроверка подписок"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                checked = await self.revalidate(bot, 2 * interval)
+                if checked:
+                    logger.info(f"🔁 Перепроверено подписок: {checked}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка перепроверки подписок: {e}")
+    
+    async def close(self):
+        """Остановка фоновой перепроверки"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Метрики кэша"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
\ No newline at end of file
@@ -4,43 +4,16 @@
 """
 
 from typing import Dict, Any, List
-from config.settings import Settings
+from config.settings import get_settings
+from utils.cards import get_card_renderer
 
 def format_profile_text(user: Dict[str, Any], show_contact: bool = False) -> str:
     """Форматирование профиля пользователя"""
-    settings = Settings()
-    
-    text = f"👤 {user['name']}\n"
-    text += f"🎮 {user['nickname']}\n"
-    text += f"🎂 {user['age']} лет\n"
-    
-    # Рейтинг
-    rating_options = settings.get_rating_options(user['game'])
-    rating_text = rating_options.get(user['rating'], user['rating'])
-    text += f"🏆 {rating_text}\n"
-    
-    # Позиции
-    if user['positions']:
-        position_options = settings.get_position_options(user['game'])
-        positions_text = []
-        for pos in user['positions']:
-            pos_text = position_options.get(pos, pos)
-            positions_text.append(pos_text)
-        text += f"⚔️ {', '.join(positions_text)}\n"
-    
-    # Дополнительная информация
-    if user['additional_info']:
-        text += f"\n📝 {user['additional_info']}\n"
-    
-    # Контакт
-    if show_contact and user.get('username'):
-        text += f"\n💬 @{user['username']}"
-    
-    return text
+    return get_card_renderer().render(user, show_contact)
 
 def format_search_filters(rating_filter: str = None, position_filter: str = None, game: str = "dota") -> str:
     """Форматирование текущих фильтров поиска"""
-    settings = Settings()
+    settings = get_settings()
     
     text = "🔍 Фильтры поиска:\n\n"
     
@@ -64,6 +37,45 @@ def format_search_filters(rating_filter: str = None, position_filter: str = None
     
     return text
 
+def format_stats_text(stats: Dict[str, int]) -> str:
+    """Форматирование детальной статистики для админа"""
+    activity = stats['active_users'] / max(stats['total_users'], 1) * 100
+    
+    return (
+        "📊 Детальная статистика:\n\n"
+        f"👥 Всего пользователей: {stats['total_users']}\n"
+        f"🎮 Dota 2: {stats['dota_users']}\n"
+        f"🔫 CS2: {stats['cs_users']}\n"
+        f"📦 В архиве: {stats['archived_users']}\n"
+        f"🔥 Активных за неделю: {stats['active_users']}\n"
+        f"💖 Матчей: {stats['total_matches']}\n"
+        f"👍 Лайков сегодня: {stats['today_likes']}\n\n"
+        f"📈 Активность: {activity:.1f}%"
+    )
+
+def format_match_notification(match_name: str = None) -> str:
+    """Уведомление о новом матче"""
+    if match_name:
+        return f"🎉 У вас новый матч!\n\n{match_name} лайкнул вас в ответ!"
+    return "🎉 У вас новый матч!"
+
+def format_likes_digest(count: int) -> str:
+    """Уведомление о новых лайках (несколько лайков - одним сообщением)"""
+    if count <= 1:
+        return NEW_LIKE_NOTIFICATION.strip()
+    
+    if count % 10 == 1 and count % 100 != 11:
+        likes = "новый лайк"
+    elif count % 10 in (2, 3, 4) and count % 100 not in (12, 13, 14):
+        likes = "новых лайка"
+    else:
+        likes = "новых лайков"
+    
+    return (
+        f"❤️ У вас {count} {likes}!\n\n"
+        "Зайдите в \"Твои лайки\", чтобы посмотреть кто это и ответить взаимностью."
+    )
+
 # Константы сообщений
 WELCOME_MESSAGE = """
 🎮 Добро пожаловать в TeammateBot!
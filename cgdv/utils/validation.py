@@ -0,0 +1,163 @@
+# utils/validation.py
+"""
+Декларативная валидация полей анкет и опросов
+
+Шаблоны компилируются при импорте, а ограничения и тексты ошибок
+подставляются один раз при описании схемы. Модуль не зависит от
+фреймворка и настроек, поэтому его используют оба бота (tgbot_for_cg
+импортирует его как cgdv.utils.validation).
+"""
+
+import abc
+import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+# Анкета TeammateBot
+NAME_PATTERN = re.compile(r'[a-zA-Zа-яА-ЯёЁ\s]+')
+NICKNAME_PATTERN = re.compile(r'[a-zA-Z0-9а-яА-ЯёЁ_\-\.]+')
+
+# Опрос tgbot_for_cg (в фильтрах сообщений нужны якоря)
+MMR_PATTERN = re.compile(r'^\d+$')
+ROLES_PATTERN = re.compile(r'^\d+(\s*,\s*\d+)*$')
+TG_PATTERN = re.compile(r'^@[a-zA-Z0-9_]{5,32}$')
+
+class Field(abc.ABC):
+    """Поле схемы: приводит значение к нужному виду или возвращает ошибку"""
+    
+    def __init__(self, errors: Dict[str, str], required: bool = True, default: Any = None):
+        self.errors = {'type': "❌ Неверный формат", **errors}
+        self.required = required
+        self.default = default
+    
+    @abc.abstractmethod
+    def validate(self, value: Any) -> Tuple[Any, str]:
+        """Очищенное значение и текст ошибки (пустой, если ошибки нет)"""
+
+class TextField(Field):
+    """Строка: обрезка пробелов, длина, число слов и допустимые символы"""
+    
+    def __init__(self, errors: Dict[str, str], min_length: int = 0, max_length: Optional[int] = None,
+                 min_words: int = 0, pattern: Optional[Pattern] = None, **kwargs):
+        super().__init__(errors, **kwargs)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_words = min_words
+        self.pattern = pattern
+    
+    def validate(self, value: Any) -> Tuple[Any, str]:
+        if not isinstance(value, str):
+            return None, self.errors['type']
+        value = value.strip()
+        
+        if len(value) < self.min_length:
+            return None, self.errors['short']
+        if self.max_length is not None and len(value) > self.max_length:
+            return None, self.errors['long']
+        if self.min_words and len(value.split()) < self.min_words:
+            return None, self.errors['words']
+        if self.pattern is not None and not self.pattern.fullmatch(value):
+            return None, self.errors['pattern']
+        
+        return value, ""
+
+class IntField(Field):
+    """Целое число в допустимом диапазоне"""
+    
+    def __init__(self, errors: Dict[str, str], min_value: Optional[int] = None,
+                 max_value: Optional[int] = None, **kwargs):
+        super().__init__(errors, **kwargs)
+        self.min_value = min_value
+        self.max_value = max_value
+    
+    def validate(self, value: Any) -> Tuple[Any, str]:
+        try:
+            value = int(value.strip() if isinstance(value, str) else value)
+        except (TypeError, ValueError):
+            return None, self.errors['type']
+        
+        if self.min_value is not None and value < self.min_value:
+            return None, self.errors['min']
+        if self.max_value is not None and value > self.max_value:
+            return None, self.errors['max']
+        
+        return value, ""
+
+class ChoiceField(Field):
+    """Значение (или список значений при ``many``) из заданного набора"""
+    
+    def __init__(self, errors: Dict[str, str], choices: Iterable[Any], many: bool = False,
+                 min_count: int = 1, **kwargs):
+        super().__init__(errors, **kwargs)
+        self.choices = frozenset(choices)
+        self.many = many
+        self.min_count = min_count
+    
+    def validate(self, value: Any) -> Tuple[Any, str]:
+        if not self.many:
+            return (value, "") if value in self.choices else (None, self.errors['choice'])
+        
+        if not isinstance(value, (list, tuple)):
+            return None, self.errors['type']
+        if len(value) < self.min_count:
+            return None, self.errors['empty']
+        if not self.choices.issuperset(value):
+            return None, self.errors['choice']
+        
+        return list(value), ""
+
+class NumberListField(Field):
+    """Номера через запятую («1, 3, 5») в диапазоне; список номеров тоже принимается"""
+    
+    def __init__(self, errors: Dict[str, str], min_value: int, max_value: int, **kwargs):
+        super().__init__(errors, **kwargs)
+        self.min_value = min_value
+        self.max_value = max_value
+    
+    def validate(self, value: Any) -> Tuple[Any, str]:
+        items = value.split(',') if isinstance(value, str) else value
+        try:
+            numbers = [int(item.strip() if isinstance(item, str) else item) for item in items]
+        except (TypeError, ValueError):
+            return None, self.errors['type']
+        
+        if not numbers or any(num < self.min_value or num > self.max_value for num in numbers):
+            return None, self.errors['range']
+        
+        return numbers, ""
+
+class Schema:
+    """Набор полей; проверка словаря целиком и пачки словарей"""
+    
+    def __init__(self, fields: Dict[str, Field], missing: str = "❌ Поле не заполнено"):
+        self.fields = fields
+        self.missing = missing
+    
+    def validate_field(self, name: str, value: Any) -> Tuple[Any, str]:
+        """Проверка одного поля"""
+        return self.fields[name].validate(value)
+    
+    def validate(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Очищенные значения и ошибки по полям"""
+        cleaned: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        
+        for name, field in self.fields.items():
+            value = data.get(name)
+            if value is None:
+                if field.required:
+                    errors[name] = self.missing
+                else:
+                    cleaned[name] = field.default
+                continue
+            
+            value, error = field.validate(value)
+            if error:
+                errors[name] = error
+            else:
+                cleaned[name] = value
+        
+        return cleaned, errors
+    
+    def validate_many(self, rows: Sequence[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, str]]]:
+        """Проверка пачки записей (импорт)"""
+        return [self.validate(row) for row in rows]
\ No newline at end of file
@@ -3,72 +3,110 @@
 Валидаторы для бота поиска сокомандников
 """
 
-import re
-from config.settings import Settings
+from typing import Any, Dict, List, Sequence, Tuple
+
+from config.settings import Settings, get_settings
+from utils.validation import (
+    NAME_PATTERN, NICKNAME_PATTERN, ChoiceField, Field, IntField, Schema, TextField
+)
+
+def profile_fields(settings: Settings) -> Dict[str, Field]:
+    """Поля анкеты, общие для всех игр"""
+    return {
+        'name': TextField(
+            {
+                'short': "❌ Имя слишком короткое (минимум 2 символа)",
+                'long': f"❌ Имя слишком длинное (максимум {settings.MAX_NAME_LENGTH} символов)",
+                # Имя и фамилия
+                'words': "❌ Введите имя и фамилию",
+                'pattern': "❌ Имя должно содержать только буквы",
+            },
+            min_length=2, max_length=settings.MAX_NAME_LENGTH, min_words=2, pattern=NAME_PATTERN
+        ),
+        'nickname': TextField(
+            {
+                'short': "❌ Никнейм слишком короткий (минимум 2 символа)",
+                'long': f"❌ Никнейм слишком длинный (максимум {settings.MAX_NICKNAME_LENGTH} символов)",
+                'pattern': "❌ Никнейм может содержать только буквы, цифры, _, -, .",
+            },
+            min_length=2, max_length=settings.MAX_NICKNAME_LENGTH, pattern=NICKNAME_PATTERN
+        ),
+        'age': IntField(
+            {
+                'type': "❌ Возраст должен быть числом",
+                'min': f"❌ Минимальный возраст: {settings.MIN_AGE} лет",
+                'max': f"❌ Максимальный возраст: {settings.MAX_AGE} лет",
+            },
+            min_value=settings.MIN_AGE, max_value=settings.MAX_AGE
+        ),
+        'additional_info': TextField(
+            {'long': f"❌ Слишком много текста (максимум {settings.MAX_INFO_LENGTH} символов)"},
+            max_length=settings.MAX_INFO_LENGTH, required=False, default=""
+        ),
+        'photo_id': TextField({}, required=False),
+    }
+
+def profile_schema(settings: Settings, game: str) -> Schema:
+    """Схема анкеты для игры: общие поля, рейтинг и позиции"""
+    fields = profile_fields(settings)
+    fields['rating'] = ChoiceField(
+        {'choice': "❌ Неизвестный рейтинг"},
+        settings.get_rating_options(game)
+    )
+    fields['positions'] = ChoiceField(
+        {'empty': "❌ Выберите хотя бы одну позицию", 'choice': "❌ Неизвестная позиция"},
+        settings.get_position_options(game), many=True
+    )
+    return Schema(fields)
 
 class Validators:
-    """Класс валидаторов"""
+    """Класс валидаторов
+    
+    Схемы анкет собираются один раз из настроек; отдельные поля
+    проверяются в шагах FSM, анкета целиком - перед сохранением и при
+    импорте.
+    """
+    
+    GAMES = ("dota", "cs")
+    
+    def __init__(self, settings: Settings = None):
+        self.settings = settings or get_settings()
+        self.schemas: Dict[str, Schema] = {
+            game: profile_schema(self.settings, game) for game in self.GAMES
+        }
+        self.fields = self.schemas[self.GAMES[0]].fields
     
-    def __init__(self):
-        self.settings = Settings()
+    def _check(self, name: str, value: Any) -> Tuple[bool, str]:
+        """Проверка одного поля анкеты"""
+        _, error = self.fields[name].validate(value)
+        return not error, error
     
     def validate_name(self, name: str) -> tuple[bool, str]:
         """Валидация имени"""
-        name = name.strip()
-        
-        if len(name) < 2:
-            return False, "❌ Имя слишком короткое (минимум 2 символа)"
-        
-        if len(name) > self.settings.MAX_NAME_LENGTH:
-            return False, f"❌ Имя слишком длинное (максимум {self.settings.MAX_NAME_LENGTH} символов)"
-        
-        # Проверяем что есть хотя бы две части (имя и фамилия)
-        parts = name.split()
-        if len(parts) < 2:
-            return False, "❌ Введите имя и фамилию"
-        
-        # Проверяем что содержит только буквы и пробелы
-        if not re.match(r'^[a-zA-Zа-яА-ЯёЁ\s]+$', name):
-            return False, "❌ Имя должно содержать только буквы"
-        
-        return True, ""
+        return self._check('name', name)
     
     def validate_nickname(self, nickname: str) -> tuple[bool, str]:
         """Валидация никнейма"""
-        nickname = nickname.strip()
-        
-        if len(nickname) < 2:
-            return False, "❌ Никнейм слишком короткий (минимум 2 символа)"
-        
-        if len(nickname) > self.settings.MAX_NICKNAME_LENGTH:
-            return False, f"❌ Никнейм слишком длинный (максимум {self.settings.MAX_NICKNAME_LENGTH} символов)"
-        
-        # Проверяем допустимые символы
-        if not re.match(r'^[a-zA-Z0-9а-яА-ЯёЁ_\-\.]+$', nickname):
-            return False, "❌ Никнейм может содержать только буквы, цифры, _, -, ."
-        
-        return True, ""
+        return self._check('nickname', nickname)
     
     def validate_age(self, age_str: str) -> tuple[bool, str]:
         """Валидация возраста"""
-        try:
-            age = int(age_str.strip())
-        except ValueError:
-            return False, "❌ Возраст должен быть числом"
-        
-        if age < self.settings.MIN_AGE:
-            return False, f"❌ Минимальный возраст: {self.settings.MIN_AGE} лет"
-        
-        if age > self.settings.MAX_AGE:
-            return False, f"❌ Максимальный возраст: {self.settings.MAX_AGE} лет"
-        
-        return True, ""
+        return self._check('age', age_str)
     
     def validate_additional_info(self, info: str) -> tuple[bool, str]:
         """Валидация дополнительной информации"""
-        info = info.strip()
-        
-        if len(info) > self.settings.MAX_INFO_LENGTH:
-            return False, f"❌ Слишком много текста (максимум {self.settings.MAX_INFO_LENGTH} символов)"
+        return self._check('additional_info', info)
+    
+    def validate_profile(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Проверка анкеты целиком: очищенные значения и ошибки по полям.
         
-        return True, ""
\ No newline at end of file
+        Игра берется из ``data['game']``.
+        """
+        schema = self.schemas.get(data.get('game'))
+        if schema is None:
+            return {}, {'game': "❌ Неизвестная игра"}
+        return schema.validate(data)
+    
+    def validate_profiles(self, rows: Sequence[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, str]]]:
+        """Проверка пачки анкет (импорт)"""
+        return [self.validate_profile(row) for row in rows]
\ No newline at end of file
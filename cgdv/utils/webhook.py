@@ -0,0 +1,106 @@
+# utils/webhook.py
+"""
+Прием обновлений через webhook на aiohttp
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Any, Awaitable, Callable, Dict
+
+from aiohttp import web
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import TelegramObject, Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+class UpdateRecorder(BaseMiddleware):
+    """Запись входящих обновлений в JSONL для последующего воспроизведения"""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(event.model_dump_json(exclude_none=True) + "\n")
+            except OSError as e:
+                logger.error(f"Ошибка записи обновления: {e}")
+        
+        return await handler(event, data)
+
+async def healthcheck(request: web.Request) -> web.Response:
+    """Проверка живости для балансировщика"""
+    return web.Response(text="ok")
+
+def build_webhook_app(dp: Dispatcher, bot: Bot, settings: Settings) -> web.Application:
+    """aiohttp-приложение с обработчиком webhook"""
+    app = web.Application()
+    app.router.add_get("/healthz", healthcheck)
+    
+    # Каждый запрос aiohttp обрабатывает в своей задаче, поэтому обновления идут
+    # параллельно (до WEBHOOK_MAX_CONNECTIONS). handle_in_background=False:
+    # ответ отдается после обработки, поэтому при остановке сервер дожидается
+    # текущих обновлений, а при ошибке Telegram повторит доставку.
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=False,
+        secret_token=settings.WEBHOOK_SECRET or None
+    ).register(app, path=settings.WEBHOOK_PATH)
+    
+    # startup/shutdown диспетчера вместе с жизненным циклом приложения
+    setup_application(app, dp, bot=bot)
+    return app
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings: Settings):
+    """Запуск webhook-сервера до получения SIGINT/SIGTERM"""
+    app = build_webhook_app(dp, bot, settings)
+    
+    runner = web.AppRunner(app, shutdown_timeout=settings.WEBHOOK_SHUTDOWN_TIMEOUT)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    await site.start()
+    logger.info(
+        f"🌐 Webhook слушает {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}"
+    )
+    
+    try:
+        if settings.WEBHOOK_URL:
+            await bot.set_webhook(
+                url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+                secret_token=settings.WEBHOOK_SECRET or None,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS
+            )
+            logger.info(f"🔗 Webhook зарегистрирован: {settings.WEBHOOK_URL}")
+        
+        await _wait_for_stop_signal()
+    finally:
+        # Перестаем принимать запросы и дожидаемся обработки текущих.
+        # Webhook в Telegram не удаляем: его могут обслуживать другие экземпляры.
+        await runner.cleanup()
+        logger.info("🛑 Webhook-сервер остановлен")
+
+async def _wait_for_stop_signal():
+    """Ожидание SIGINT/SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: остановка по Ctrl+C через KeyboardInterrupt
+            pass
+    
+    await stop.wait()
\ No newline at end of file
@@ -18,6 +18,7 @@ from tgbot_for_cg import (
     wrong_tg_input,
     multi_poll_age,
     multi_poll_name,
+    subscriptions,
     BOT_TOKEN,
     logger,
     MAIN_MENU,
@@ -44,13 +45,29 @@ from telegram.ext import (
     filters
 )
 
+from cgdv.config.settings import get_settings
+from cgdv.utils.validation import MMR_PATTERN, ROLES_PATTERN, TG_PATTERN
+
+async def post_init(application: Application):
+    # Период фоновой перепроверки подписок (сек, 0 - выкл) - SUBSCRIPTION_REVALIDATE_INTERVAL
+    subscriptions.start(application.bot, get_settings().SUBSCRIPTION_REVALIDATE_INTERVAL)
+
+async def post_shutdown(application: Application):
+    await subscriptions.close()
+
 def main():
     worksheet = init_google_sheets()
     if worksheet:
         logger.info("Подключение к Google Таблицам установлено")
     else:
         logger.warning("Не удалось подключиться к Google Таблицам. Данные не будут сохраняться.")
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler('start', start)],
@@ -71,18 +88,18 @@ def main():
                 MessageHandler(filters.TEXT & ~filters.COMMAND, single_poll_nick)
             ],
             SINGLE_POLL_MMR: [
-                MessageHandler(filters.Regex(r'^\d+$') & ~filters.COMMAND, single_poll_mmr),
+                MessageHandler(filters.Regex(MMR_PATTERN) & ~filters.COMMAND, single_poll_mmr),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, wrong_mmr_input)
             ],
             SINGLE_POLL_ROLES: [
-                MessageHandler(filters.Regex(r'^\d+(\s*,\s*\d+)*$') & ~filters.COMMAND, single_poll_roles),
+                MessageHandler(filters.Regex(ROLES_PATTERN) & ~filters.COMMAND, single_poll_roles),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, wrong_roles_input)
             ],
             SINGLE_POLL_DOTABUFF: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, single_poll_dotabuff)
             ],
             SINGLE_POLL_TG: [
-                MessageHandler(filters.Regex(r'^@[a-zA-Z0-9_]{5,32}$') & ~filters.COMMAND, single_poll_tg),
+                MessageHandler(filters.Regex(TG_PATTERN) & ~filters.COMMAND, single_poll_tg),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, wrong_tg_input)
             ],
             SINGLE_POLL_AGREEMENT: [
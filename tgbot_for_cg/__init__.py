@@ -3,6 +3,7 @@ from .core import (
     start,
     init_google_sheets,
     check_subscription,
+    subscriptions,
     single_poll_name,
     single_poll_last_name,
     single_poll_nick,
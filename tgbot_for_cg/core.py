@@ -9,6 +9,10 @@ from telegram.ext import (
     ContextTypes,
 )
 
+from cgdv.config.settings import get_settings
+from cgdv.utils.subscriptions import SubscriptionCache
+from cgdv.utils.validation import TG_PATTERN, IntField, NumberListField, Schema, TextField
+
 from .keyboards import create_subscription_keyboard, create_main_menu_keyboard, create_agreement_keyboard, create_main_menu_admin_keyboard
 from .config import SCOPES, SERVICE_ACCOUNT_FILE, SPREADSHEET_ID, CHANNEL_USERNAME, CHANNEL_ID, ADMIN_ID
 from .logger_setup import logger
@@ -28,6 +32,40 @@ from .global_states import (
     CHECK_SUBSCRIPTION
 )
 
+ROLES_HELP = (
+    "Доступные роли:\n"
+    "1 - Керри\n"
+    "2 - Мидер\n"
+    "3 - Хардлейнер\n"
+    "4 - Саппорт\n"
+    "5 - Фуллсаппорт"
+)
+
+# Поля опроса; те же шаблоны используются в фильтрах сообщений в main.py
+POLL_SCHEMA = Schema({
+    'mmr': IntField(
+        {'type': "Пожалуйста, введите MMR числом (например: 4500)",
+         'min': "Пожалуйста, введите MMR числом (например: 4500)"},
+        min_value=0
+    ),
+    'roles': NumberListField(
+        {'type': "Пожалуйста, введите только числа, разделенные запятыми (например: 1, 2, 3)",
+         'range': "Пожалуйста, введите только числа от 1 до 5\n" + ROLES_HELP},
+        min_value=1, max_value=5
+    ),
+    'tg': TextField(
+        {'pattern': (
+            "Пожалуйста, введите корректный Telegram тег.\n"
+            "Тег должен:\n"
+            "- Начинаться с @\n"
+            "- Содержать только буквы, цифры и подчеркивания\n"
+            "- Иметь длину от 5 до 32 символов (после @)\n"
+            "Пример: @my_username"
+        )},
+        pattern=TG_PATTERN
+    ),
+})
+
 def init_google_sheets(sheet_name=None):
     try:
         creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
@@ -53,11 +91,20 @@ def get_sheet_by_role(role_number):
     }
     return role_to_sheet.get(role_number, "Other Players")
 
-async def check_subscription(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+# Общий с cgdv кэш проверок подписки: /start и шаги опроса не ходят в API каждый раз.
+# Время жизни, размер и скорость перепроверки - из тех же переменных SUBSCRIPTION_*
+settings = get_settings()
+subscriptions = SubscriptionCache(
+    positive_ttl=settings.SUBSCRIPTION_TTL,
+    negative_ttl=settings.SUBSCRIPTION_NEGATIVE_TTL,
+    max_size=settings.SUBSCRIPTION_CACHE_SIZE,
+    revalidate_rate=settings.SUBSCRIPTION_REVALIDATE_RATE
+)
+
+async def check_subscription(update: Update, context: ContextTypes.DEFAULT_TYPE, force: bool = False) -> bool:
     user_id = update.effective_user.id
     try:
-        member = await context.bot.get_chat_member(chat_id=CHANNEL_ID, user_id=user_id)
-        return member.status in ['member', 'administrator', 'creator']
+        return await subscriptions.is_subscribed(context.bot, CHANNEL_ID, user_id, force=force)
     except Exception as e:
         logger.error(f"Ошибка проверки подписки: {e}")
         return False
@@ -112,8 +159,10 @@ async def single_poll_nick(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return SINGLE_POLL_MMR
 
 async def single_poll_mmr(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    mmr_text = update.message.text
-    mmr = int(mmr_text)
+    mmr, error = POLL_SCHEMA.validate_field('mmr', update.message.text)
+    if error:
+        await update.message.reply_text(error)
+        return SINGLE_POLL_MMR
 
     context.user_data['mmr'] = mmr
 
@@ -128,9 +177,7 @@ async def single_poll_mmr(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return SINGLE_POLL_ROLES
 
 async def wrong_mmr_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(
-        "Пожалуйста, введите MMR числом (например: 4500)"
-    )
+    await update.message.reply_text(POLL_SCHEMA.fields['mmr'].errors['type'])
     return SINGLE_POLL_MMR
 
 def format_roles(role_numbers):
@@ -147,28 +194,9 @@ def format_roles(role_numbers):
     return ", ".join(role_names)
 
 async def single_poll_roles(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    text = update.message.text
-
-    numbers = [num.strip() for num in text.split(',')]
-
-    try:
-        numbers = [int(num) for num in numbers]
-    except ValueError:
-        await update.message.reply_text(
-            "Пожалуйста, введите только числа, разделенные запятыми (например: 1, 2, 3)"
-        )
-        return SINGLE_POLL_ROLES
-
-    if any(num < 1 or num > 5 for num in numbers):
-        await update.message.reply_text(
-            "Пожалуйста, введите только числа от 1 до 5\n"
-            "Доступные роли:\n"
-            "1 - Керри\n"
-            "2 - Мидер\n"
-            "3 - Хардлейнер\n"
-            "4 - Саппорт\n"
-            "5 - Фуллсаппорт"
-        )
+    numbers, error = POLL_SCHEMA.validate_field('roles', update.message.text)
+    if error:
+        await update.message.reply_text(error)
         return SINGLE_POLL_ROLES
 
     context.user_data['roles_numbers'] = numbers
@@ -181,13 +209,7 @@ async def single_poll_roles(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def wrong_roles_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
-        "Пожалуйста, введите номера ролей через запятую (например: 1, 3, 5)\n"
-        "Доступные роли:\n"
-        "1 - Керри\n"
-        "2 - Мидер\n"
-        "3 - Хардлейнер\n"
-        "4 - Саппорт\n"
-        "5 - Фуллсаппорт"
+        "Пожалуйста, введите номера ролей через запятую (например: 1, 3, 5)\n" + ROLES_HELP
     )
     return SINGLE_POLL_ROLES
 
@@ -211,14 +233,7 @@ async def single_poll_tg(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return SINGLE_POLL_AGREEMENT
 
 async def wrong_tg_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(
-        "Пожалуйста, введите корректный Telegram тег.\n"
-        "Тег должен:\n"
-        "- Начинаться с @\n"
-        "- Содержать только буквы, цифры и подчеркивания\n"
-        "- Иметь длину от 5 до 32 символов (после @)\n"
-        "Пример: @my_username"
-    )
+    await update.message.reply_text(POLL_SCHEMA.fields['tg'].errors['pattern'])
     return SINGLE_POLL_TG
 
 async def single_poll_agreement(update: Update, context: ContextTypes.DEFAULT_TYPE):
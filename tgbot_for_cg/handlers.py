@@ -17,7 +17,7 @@ async def check_subscription_handler(update: Update, context: ContextTypes.DEFAU
     query = update.callback_query
     await query.answer()
 
-    is_subscribed = await check_subscription(update, context)
+    is_subscribed = await check_subscription(update, context, force=True)
     if is_subscribed:
         user_id = update.effective_user.id
         user_data[user_id] = {}